@@ -4,7 +4,7 @@ import contextlib
 import os.path
 
 
-@pytest.fixture()
+@pytest.fixture(scope="session")
 def data_dir():
     """Returns the data directory within the test folder"""
     return os.path.join(os.path.dirname(__file__), "data", "configurations")
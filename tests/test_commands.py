@@ -1,81 +1,104 @@
+import importlib
+import json
+import os.path
+
 import click.testing
 import pytest
-import ruamel.yaml as yaml
 
 import ubimaior.commands
 import ubimaior.formats
 
+#: Formats registered when the tests are collected
+FORMATS = tuple(ubimaior.formats.FORMATTERS)
 
-@pytest.fixture()
+#: Functions decoding the output of "show" for each format. Optional
+#: backends are imported only when they are needed.
+DECODERS = {
+    "json": json.loads,
+    "toml": lambda output: importlib.import_module("toml").loads(output),
+    "yaml": lambda output: importlib.import_module("ruamel.yaml").YAML(typ="safe").load(output),
+}
+
+
+@pytest.fixture(scope="module")
 def runner():
     return click.testing.CliRunner()
 
 
-@pytest.fixture(params=ubimaior.formats.FORMATTERS)
+@pytest.fixture(params=FORMATS)
 def fmt(request):
     return request.param
 
 
+@pytest.fixture()
+def configuration(data_dir):
+    """Returns the option to select the test configuration file, without changing directory"""
+    return "--configuration={0}".format(os.path.join(data_dir, ".ubimaior.yaml"))
+
+
 def test_showing_help(runner, working_dir, data_dir):
     result = runner.invoke(ubimaior.commands.main, ["--help"])
     assert result.exit_code == 0
     assert "Manages hierarchical configuration files" in result.output
 
+    # Search the configuration file starting from the working directory
     with working_dir(data_dir):
         result = runner.invoke(ubimaior.commands.main, ["show", "--help"])
         assert result.exit_code == 0
 
 
-def test_show_all_formats(runner, working_dir, data_dir, fmt):
-    with working_dir(data_dir):
-        result = runner.invoke(
-            ubimaior.commands.main, ["--format={0}".format(fmt), "show", "config_nc"]
-        )
-        assert result.exit_code == 0
-
-
-def test_failures(runner, working_dir, data_dir):
+def test_failures(runner, configuration):
     # .ubimaior.yaml not found
     result = runner.invoke(ubimaior.commands.main, ["show", "--help"])
     assert result.exit_code == 1
     assert "ubimaior configuration file not found" in result.output
 
     # Call validate without having a schema
-    with working_dir(data_dir):
-        result = runner.invoke(ubimaior.commands.main, ["show", "--validate", "config_nc"])
-        assert result.exit_code == 1
-        assert " validation schema not found" in result.output
+    result = runner.invoke(
+        ubimaior.commands.main, [configuration, "show", "--validate", "config_nc"]
+    )
+    assert result.exit_code == 1
+    assert " validation schema not found" in result.output
+
+
+def test_validate_configurations(runner, data_dir):
+    result = runner.invoke(
+        ubimaior.commands.main,
+        [
+            "--configuration={0}".format(os.path.join(data_dir, ".ubimaior.json")),
+            "show",
+            "--validate",
+            "config_nc",
+        ],
+    )
+    assert result.exit_code == 0
 
 
-def test_validate_configurations(runner, working_dir, data_dir):
-    with working_dir(data_dir):
-        result = runner.invoke(
-            ubimaior.commands.main,
-            ["--configuration=.ubimaior.json", "show", "--validate", "config_nc"],
-        )
-        assert result.exit_code == 0
+def test_show_blame(runner, configuration, fmt):
+    result = runner.invoke(
+        ubimaior.commands.main,
+        [configuration, "--format={0}".format(fmt), "show", "--blame", "config_nc"],
+    )
+    assert result.exit_code == 0
 
 
-def test_show_blame(runner, working_dir, data_dir, fmt):
-    with working_dir(data_dir):
-        result = runner.invoke(
-            ubimaior.commands.main,
-            ["--format={0}".format(fmt), "show", "--blame", "config_nc"],
-        )
-        assert result.exit_code == 0
+def test_output_is_valid(runner, configuration, fmt):
+    result = runner.invoke(
+        ubimaior.commands.main, [configuration, "--format={0}".format(fmt), "show", "config_nc"]
+    )
+    assert result.exit_code == 0
 
+    obj = DECODERS[fmt](result.output)
 
-def test_output_is_valid(runner, working_dir, data_dir, fmt, monkeypatch):
-    with working_dir(data_dir):
-        result = runner.invoke(
-            ubimaior.commands.main, ["--format={0}".format(fmt), "show", "config_nc"]
-        )
-        decoder = getattr(ubimaior.formats, fmt)
-        obj = (
-            decoder.loads(result.output)
-            if fmt != "yaml"
-            else decoder.load(result.output, Loader=yaml.Loader)
-        )
-
-        assert all(key in obj for key in ("foo", "nested", "bar", "baz"))
-        assert obj["nested"]["a"] == [1, 2, 3, 4, 5, 6]
+    assert all(key in obj for key in ("foo", "nested", "bar", "baz"))
+    assert obj["nested"]["a"] == [1, 2, 3, 4, 5, 6]
+
+
+def test_provenance_with_many_scopes():
+    # There are more scopes than available colors
+    provenance = [["scope{0}".format(i)] for i in range(10)] + [[]]
+    lines = ubimaior.commands.format_provenance(provenance)
+
+    assert len(lines) == len(provenance)
+    assert len({click.unstyle(line) for line in lines[:-1]}) == 10
+    assert all(click.unstyle(line).endswith("|") for line in lines)
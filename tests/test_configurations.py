@@ -1,11 +1,25 @@
+import datetime
+import json
 import os.path
+
+import jsonschema
 import pytest
 
 import ubimaior
 import ubimaior.configurations
+import ubimaior.mappings
+
+#: Schema file used to validate the test configurations
+SCHEMA_FILE = os.path.join(
+    os.path.dirname(__file__), "data", "configurations", "schema", "config_nc_schema.json"
+)
 
+with open(SCHEMA_FILE) as schema_stream:
+    #: Same schema as above, but already in memory
+    SCHEMA_DICT = json.load(schema_stream)
 
-@pytest.fixture()
+
+@pytest.fixture(scope="session")
 def mock_scopes(data_dir):
     return [
         ("highest", os.path.join(data_dir, "highest")),
@@ -38,13 +52,8 @@ def config_format(request):
     params=[
         None,  # No schema validation
         {"type": "object"},  # Validate from an object in memory
-        os.path.join(
-            os.path.dirname(__file__),
-            "data",
-            "configurations",
-            "schema",
-            "config_nc_schema.json",
-        ),  # Validate from a schema stored in a file
+        SCHEMA_FILE,  # Validate from a schema stored in a file
+        SCHEMA_DICT,  # Validate from the same schema, once it is in memory
     ]
 )
 def schema(request):
@@ -127,9 +136,13 @@ class TestBasicAPI(object):
         # Try to delete an item
         del default["scopes"]
         assert len(default) == 2
+        with pytest.raises(KeyError):
+            default["scopes"]
 
-        # Assigning that key is still valid
+        # Assigning that key is still valid, and scopes are stored as Scope objects
         default["scopes"] = [("single", "somedir")]
+        assert default.scopes[0].name == "single"
+        assert default.scopes[0].path == "somedir"
 
         # Assigning other settings is an error
         with pytest.raises(KeyError):
@@ -155,9 +168,8 @@ class TestBasicAPI(object):
 
         # Check that I can't have modifications in scratch when dumping
         cfg["foobar"] = [1, 2, 3]
-        with pytest.raises(ValueError) as excinfo:
+        with pytest.raises(ValueError, match="cannot dump an object with modifications in scratch"):
             ubimaior.configurations.dump(cfg, "config_nc", scopes=tmp_scopes)
-        assert "cannot dump an object with modifications in scratch" in str(excinfo.value)
 
         # Check that instead flattening the hierarchy works
         cfg = cfg.flattened()
@@ -168,20 +180,140 @@ class TestBasicAPI(object):
 
         # Check that scopes must match when dumping
         tmp_scopes[2:] = []
-        with pytest.raises(ValueError) as excinfo:
+        with pytest.raises(ValueError, match="scopes in the object do not match"):
             ubimaior.configurations.dump(cfg_dumped, "config_nc", scopes=tmp_scopes)
-        assert "scopes in the object do not match" in str(excinfo.value)
 
     def test_file_errors_on_validate(self, schema_with_wrong_format):
         # Passing as argument a schema that does not exist
-        with pytest.raises(ValueError) as excinfo:
+        with pytest.raises(ValueError, match="does not exist or is not a file"):
             ubimaior.configurations.validate({}, schema="foo")
-        assert "does not exist or is not a file" in str(excinfo.value)
 
         # Passing as argument a schema with the wrong format
-        with pytest.raises(ValueError) as excinfo:
+        with pytest.raises(ValueError, match=r"is not a valid format \[Allowed formats are:"):
             ubimaior.configurations.validate({}, schema=schema_with_wrong_format)
-        assert "is not a valid format [Allowed formats are:" in str(excinfo.value)
+
+    def test_schema_errors_on_validate(self, mock_scopes, config_format):
+        cfg = ubimaior.configurations.load(
+            "config_nc", scopes=mock_scopes, config_format=config_format
+        )
+
+        # The configuration does not conform to the schema
+        with pytest.raises(jsonschema.ValidationError):
+            ubimaior.configurations.validate(cfg, {"type": "array"})
+
+        # The schema itself is not valid, also when it was requested before
+        for _ in range(2):
+            with pytest.raises(jsonschema.SchemaError):
+                ubimaior.configurations.validate(cfg, {"type": 1})
+
+    def test_schema_not_serializable_to_json(self, tmpdir):
+        # Values in a schema don't need a JSON representation, e.g. dates loaded from YAML
+        cfg = ubimaior.mappings.OverridableMapping(
+            [("highest", {"day": datetime.date(2020, 1, 1)})]
+        )
+        schema = {"type": "object", "properties": {"day": {"enum": [datetime.date(2020, 1, 1)]}}}
+        for _ in range(2):
+            ubimaior.configurations.validate(cfg, schema)
+
+        schema_file = tmpdir.join("schema.yaml")
+        schema_file.write("properties:\n  day:\n    enum: [2020-01-01]\n")
+        ubimaior.configurations.validate(cfg, str(schema_file))
+
+        schema["properties"]["day"]["enum"] = [datetime.date(2021, 1, 1)]
+        with pytest.raises(jsonschema.ValidationError):
+            ubimaior.configurations.validate(cfg, schema)
+
+    def test_modified_schema_file(self, mock_scopes, tmpdir):
+        cfg = ubimaior.configurations.load("config_nc", scopes=mock_scopes, config_format="json")
+        schema_file = tmpdir.join("schema.json")
+        schema_file.write('{"type": "object"}')
+        ubimaior.configurations.validate(cfg, str(schema_file))
+
+        # A schema file that changed on disk is read again
+        schema_file.write('{"type": "array"}')
+        schema_file.setmtime(schema_file.mtime() + 10)
+        with pytest.raises(jsonschema.ValidationError):
+            ubimaior.configurations.validate(cfg, str(schema_file))
+
+    def test_modified_scope_file(self, tmpdir):
+        scopes = [("highest", str(tmpdir))]
+        scope_file = tmpdir.join("config.yaml")
+        scope_file.write('{"foo": {"bar": 1}}')
+
+        # Modifying a loaded object doesn't affect the next load
+        cfg = ubimaior.configurations.load("config", scopes=scopes, config_format="yaml")
+        cfg.mappings["highest"]["foo"]["bar"] = 2
+        cfg = ubimaior.configurations.load("config", scopes=scopes, config_format="yaml")
+        assert cfg["foo"]["bar"] == 1
+
+        # A scope file that changed on disk is read again
+        scope_file.write('{"foo": {"bar": 3}}')
+        scope_file.setmtime(scope_file.mtime() + 10)
+        cfg = ubimaior.configurations.load("config", scopes=scopes, config_format="yaml")
+        assert cfg["foo"]["bar"] == 3
+
+        # So is a file replaced by an atomic rename with the same size and modification time
+        mtime = scope_file.mtime()
+        new_file = tmpdir.join("config.yaml.new")
+        new_file.write('{"foo": {"bar": 4}}')
+        new_file.setmtime(mtime)
+        new_file.rename(scope_file)
+        cfg = ubimaior.configurations.load("config", scopes=scopes, config_format="yaml")
+        assert cfg["foo"]["bar"] == 4
+
+    def test_scope_file_cache_is_bounded(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(ubimaior.configurations, "_SCOPE_FILE_CACHE_SIZE", 2)
+        ubimaior.configurations.clear_cache()
+        for name in ("a", "b", "c"):
+            scope_dir = tmpdir.mkdir(name)
+            scope_dir.join("config.yaml").write('{"foo": 1}')
+            ubimaior.configurations.load(
+                "config", scopes=[(name, str(scope_dir))], config_format="yaml"
+            )
+
+        # The least recently used file was evicted
+        cached = [
+            os.path.basename(os.path.dirname(x)) for x in ubimaior.configurations._SCOPE_FILE_CACHE
+        ]
+        assert cached == ["b", "c"]
+
+        # Everything can be dropped on request
+        ubimaior.configurations.clear_cache()
+        assert not ubimaior.configurations._SCOPE_FILE_CACHE
+
+        # JSON is parsed faster than it would be copied, so it isn't cached
+        tmpdir.join("a", "config.json").write('{"foo": 1}')
+        ubimaior.configurations.load(
+            "config", scopes=[("a", str(tmpdir.join("a")))], config_format="json"
+        )
+        assert not ubimaior.configurations._SCOPE_FILE_CACHE
+
+    def test_scope_file_is_a_directory(self, tmpdir):
+        # Anything that is not a regular file is treated as an empty scope
+        tmpdir.mkdir("config.json")
+        scopes = [("highest", str(tmpdir))]
+        cfg = ubimaior.configurations.load("config", scopes=scopes, config_format="json")
+        assert cfg.highest == {}
+
+    def test_scope_path_is_a_file(self, tmpdir):
+        # Scopes whose directory can't be reached are empty
+        scope_path = tmpdir.join("not_a_directory")
+        scope_path.write("")
+        scopes = [("highest", str(scope_path))]
+        cfg = ubimaior.configurations.load("config", scopes=scopes, config_format="json")
+        assert cfg.highest == {}
+
+    def test_non_ascii_round_trip(self, config_format, tmpdir):
+        scopes = [("highest", str(tmpdir))]
+        cfg = ubimaior.mappings.OverridableMapping([("highest", {"s": "è"})])
+        ubimaior.configurations.dump(cfg, "config", scopes=scopes, config_format=config_format)
+
+        # Files are UTF-8 encoded, whatever the locale is
+        scope_file = tmpdir.join("config." + config_format)
+        assert "è" in scope_file.read_binary().decode("utf-8")
+
+        cfg = ubimaior.configurations.load("config", scopes=scopes, config_format=config_format)
+        assert cfg["s"] == "è"
 
     @pytest.mark.parametrize(
         "configuration_file",
@@ -203,11 +335,17 @@ class TestBasicAPI(object):
         cfg_dumped = ubimaior.configurations.load("config_nc", scopes=tmp_scopes)
         assert cfg == cfg_dumped
 
-    def test_errors_when_sourcing_configuration_file(self, data_dir):
+    def test_errors_when_sourcing_configuration_file(self, data_dir, tmpdir):
         # Try to use a non existing file
-        with pytest.raises(IOError) as excinfo:
+        with pytest.raises(IOError, match="does not exist"):
             ubimaior.configurations.setup_from_file("doesnotexist")
-        assert "does not exist" in str(excinfo.value)
+
+        # Try to use a file without the required settings, also more than once
+        configuration_file = tmpdir.join(".ubimaior.json")
+        configuration_file.write('{"format": "json"}')
+        for _ in range(2):
+            with pytest.raises(jsonschema.ValidationError):
+                ubimaior.configurations.setup_from_file(str(configuration_file))
 
 
 def test_search_for_files(data_dir, working_dir):
@@ -220,6 +358,12 @@ def test_search_for_files(data_dir, working_dir):
 
     assert rel_search == abs_search
 
+    # Searching again from a subdirectory proceeds up to the parent directory
+    sub_search = ubimaior.configurations.search_file_in_path(
+        ".ubimaior.json", start_dir=os.path.join(data_dir, "highest")
+    )
+    assert sub_search == abs_search
+
     # If the file does not exist, the function should raise an IOError
     with pytest.raises(IOError) as exc_info:
         ubimaior.configurations.search_file_in_path("foo.txt")
@@ -1,25 +1,124 @@
+import io
+import os.path
+import subprocess
+import sys
+
 import ubimaior.formats
+import ubimaior.mappings
 
 import pytest
 
 
 def test_decorator_errors():
-    with pytest.raises(TypeError) as excinfo:
+    with pytest.raises(TypeError, match='"name" needs to be of string type'):
         ubimaior.formats.formatter(1, "FORMAT1")
-    assert '"name" needs to be of string type' in str(excinfo.value)
 
-    with pytest.raises(TypeError) as excinfo:
+    with pytest.raises(TypeError, match='"attribute" needs to be of string type'):
         ubimaior.formats.formatter("FORMAT1", 1)
-    assert '"attribute" needs to be of string type' in str(excinfo.value)
 
-    with pytest.raises(ValueError) as excinfo:
+    with pytest.raises(ValueError, match=r"ubimaior\.JSON is already defined"):
         ubimaior.formats.formatter("json", attribute="JSON")
-    assert "ubimaior.JSON is already defined" in str(excinfo.value)
 
 
-def test_no_attribute():
+def test_no_attribute(monkeypatch):
+    # Register the formatter in a copy of the registry, to not affect other tests
+    monkeypatch.setattr(ubimaior.formats, "FORMATTERS", dict(ubimaior.formats.FORMATTERS))
+
     @ubimaior.formats.formatter("mock")
     class MockFormatter(object):
         pass
 
     assert "mock" in ubimaior.formats.FORMATTERS
+
+
+def test_lazy_backends():
+    # Importing the package doesn't import optional backends, use a fresh
+    # interpreter since other tests may have imported them already
+    code = "import sys, ubimaior.formats; print(sorted(set(sys.modules) & {'ruamel.yaml', 'toml'}))"
+    root_dir = os.path.dirname(os.path.dirname(ubimaior.formats.__file__))
+    output = subprocess.check_output(
+        [sys.executable, "-c", code], cwd=root_dir, universal_newlines=True
+    )
+    assert output.strip() == "[]"
+
+    # Formatters still import them on first use
+    obj = {"foo": [1, 2]}
+    for fmt in ("yaml", "toml"):
+        stream = io.StringIO()
+        ubimaior.formats.FORMATTERS[fmt].dump(obj, stream)
+        stream.seek(0)
+        assert ubimaior.formats.FORMATTERS[fmt].load(stream) == obj
+
+
+def test_json_round_trip():
+    obj = {"foo": 1, "bar": [True, None, "a"], "baz": {"nested": 1.5}}
+    json_formatter = ubimaior.formats.FORMATTERS["json"]
+
+    stream = io.StringIO()
+    json_formatter.dump(obj, stream)
+    stream.seek(0)
+    assert json_formatter.load(stream) == obj
+
+
+@pytest.mark.parametrize(
+    "fmt", [name for name, fmt in ubimaior.formats.FORMATTERS.items() if fmt.binary]
+)
+def test_load_from_binary_streams(fmt):
+    obj = {"foo": 1, "bar": ["a", "è"]}
+    formatter = ubimaior.formats.FORMATTERS[fmt]
+
+    stream = io.StringIO()
+    formatter.dump(obj, stream)
+    assert formatter.load(io.BytesIO(stream.getvalue().encode("utf-8"))) == obj
+
+
+def test_json_dump_to_binary_stream():
+    obj = {"foo": 1, "bar": ["a", "è"]}
+    json_formatter = ubimaior.formats.FORMATTERS["json"]
+
+    stream = io.BytesIO()
+    json_formatter.dump(obj, stream)
+    stream.seek(0)
+    assert json_formatter.load(stream) == obj
+
+
+def test_custom_pretty_printer():
+    # Third-party formatters receive the indentation block, not precomputed strings
+    class IndentedValues(ubimaior.formats.PrettyPrinter):
+        def format_token(self, token, indent_block, format_fn):
+            if token.obj_type == ubimaior.formats.TokenTypes.VALUE:
+                return indent_block * token.indent_lvl + format_fn(str(token.line))
+            return None
+
+    obj = ubimaior.mappings.OverridableMapping([("highest", {"foo": {"bar": 1}})])
+    lines, _ = IndentedValues().pprint(obj)
+    assert lines == ["    1"]
+
+
+def test_json_output_does_not_depend_on_orjson(monkeypatch):
+    pytest.importorskip("orjson")
+    obj = {
+        "foo": 1,
+        "bar": ["a", "è"],
+        "baz": {"nested": 1.5, "flag": None},
+        "big": [2**70, -(2**63), 2**64 - 1, 1e21, 0.0010127930964535237],
+    }
+    json_formatter = ubimaior.formats.FORMATTERS["json"]
+
+    def round_trip():
+        stream = io.StringIO()
+        json_formatter.dump(obj, stream)
+        binary_stream = io.BytesIO()
+        json_formatter.dump(obj, binary_stream)
+        loaded = json_formatter.load(io.BytesIO(binary_stream.getvalue()))
+        lines, _ = json_formatter.pprint(ubimaior.mappings.OverridableMapping([("a", obj)]))
+        return stream.getvalue(), loaded, lines
+
+    with_orjson = round_trip()
+    monkeypatch.setattr(ubimaior.formats, "orjson", None)
+    without_orjson = round_trip()
+
+    # Integers beyond 64 bits are neither rejected nor turned into floats
+    assert with_orjson == without_orjson
+    assert with_orjson[1] == obj
+    assert type(with_orjson[1]["big"][0]) is int
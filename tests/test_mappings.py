@@ -1,294 +1,293 @@
-#!/usr/bin/env python
-# -*- coding: utf-8 -*-
-
 """Tests for `ubimaior` package."""
 
+import copy
+import operator
+
 import pytest
 
 import ubimaior
 
+#: Scopes of a merged mapping, with non-container values
+MAPPING_NC = (
+    ("highest", {"foo": 1}),
+    ("middle", {"foo": 6, "bar": "this_is_bar"}),  # type(foo) is always an int
+    ("lowest", {"bar": "4", "baz": False}),  # type(bar) is always a string
+)
 
-@pytest.fixture(params=[ubimaior.MergedMapping, ubimaior.OverridableMapping])
-def mapping_type(request):
-    return request.param
+#: Scopes of a merged mapping, with list values
+MAPPING_L = (
+    ("highest", {"foo": [1], "baz": [1, 2, 3], "foobar": []}),
+    ("middle", {"foo": [11], "bar": ["a"]}),  # type(foo) is always an int
+    ("lowest", {"foo": [111], "bar": ["b"], "baz": [4, 5, 6]}),  # type(bar) is always a string
+)
 
+#: Scopes of a merged mapping, with dict values
+MAPPING_D = (
+    ("highest", {"foo": {"a": 1}, "baz": {"a": [1, 2, 3]}}),
+    ("middle", {"foo": {"a": 11, "b": 22}, "bar": {"a": "one"}}),
+    ("lowest", {"foo": {"c": 111}, "bar": {"b": "two"}, "baz": {"a": [4, 5, 6]}}),
+)
 
-@pytest.fixture()
-def mapping_nc(mapping_type):
-    """An instance of a merged mapping, with non-container values."""
-    highest_priority = {"foo": 1}
+#: Scopes of an overridable mapping, with list values
+OVERRIDABLE_L = (
+    ("highest", {"foo": [11, 22], "baz": [1, 2, 3], "foobar": []}),
+    ("middle", {"foo:": ["a", "b"], "bar": ["a"]}),
+    ("lowest", {"foo": [111], "bar": ["b"], "baz": [4, 5, 6]}),  # type(bar) is always a string
+)
 
-    middle_priority = {"foo": 6, "bar": "this_is_bar"}  # type(foo) is always an int
+#: Scopes of an overridable mapping, with dict values
+OVERRIDABLE_D = (
+    ("highest", {"foo": {"a": 1, "b": {"xx": 1}}}),
+    ("middle", {"foo:": {"c": 2}}),
+    ("lowest", {"foo": {"d": 3}}),
+)
 
-    lowest_priority = {"bar": "4", "baz": False}  # type(bar) is always a string
 
-    merged = mapping_type(
-        [
-            ("highest", highest_priority),
-            ("middle", middle_priority),
-            ("lowest", lowest_priority),
-        ]
-    )
+#: Key of the scratch scope in overridable mappings
+SCRATCH_KEY = ubimaior.OverridableMapping.scratch_key
+
+#: Keys of "mapping_nc", in iteration order
+EXPECTED_KEYS = ["foo", "bar", "baz"]
 
-    return merged
+#: Merged lists for the key "baz" in the layouts above
+EXPECTED_BAZ = [1, 2, 3, 4, 5, 6]
+
+
+def _build(mapping_type, layout):
+    """Builds a merged mapping over a deep copy of the scopes in layout, so that
+    the mapping can be modified.
+    """
+    return mapping_type([(scope, copy.deepcopy(d)) for scope, d in layout])
 
 
 @pytest.fixture()
+def mapping_nc(mapping_type):
+    """An instance of a merged mapping, with non-container values."""
+    # Values are immutable, so copying the dictionaries in the layout is enough
+    return mapping_type([(scope, dict(d)) for scope, d in MAPPING_NC])
+
+
+@pytest.fixture(scope="module")
 def mapping_l():
     """An instance of a merged mapping, with list values."""
-    highest_priority = {"foo": [1], "baz": [1, 2, 3], "foobar": []}
+    return _build(ubimaior.MergedMapping, MAPPING_L)
+
 
-    middle_priority = {"foo": [11], "bar": ["a"]}  # type(foo) is always an int
+@pytest.fixture()
+def mapping_l_rw():
+    """Same as mapping_l, but built for each test so that it can be modified."""
+    return _build(ubimaior.MergedMapping, MAPPING_L)
 
-    lowest_priority = {
-        "foo": [111],
-        "bar": ["b"],  # type(bar) is always a string
-        "baz": [4, 5, 6],
-    }
 
-    merged = ubimaior.MergedMapping(
-        [
-            ("highest", highest_priority),
-            ("middle", middle_priority),
-            ("lowest", lowest_priority),
-        ]
-    )
+@pytest.fixture(scope="module")
+def mapping_d():
+    """An instance of a merged mapping, with dict values."""
+    return _build(ubimaior.MergedMapping, MAPPING_D)
+
 
-    return merged
+@pytest.fixture(scope="module")
+def overridable_l():
+    """An instance of a merged mapping, with list values."""
+    return _build(ubimaior.OverridableMapping, OVERRIDABLE_L)
 
 
 @pytest.fixture()
-def mapping_d():
-    """An instance of a merged mapping, with dict values."""
+def overridable_l_rw():
+    """Same as overridable_l, but built for each test so that it can be modified."""
+    return _build(ubimaior.OverridableMapping, OVERRIDABLE_L)
 
-    highest_priority = {
-        "foo": {"a": 1},
-        "baz": {"a": [1, 2, 3]},
-    }
 
-    middle_priority = {"foo": {"a": 11, "b": 22}, "bar": {"a": "one"}}
+@pytest.fixture()
+def overridable_d():
+    """An instance of a merged mapping, with dict values. Reading nested
+    dictionaries writes into the scratch scope, so this is never shared.
+    """
+    return _build(ubimaior.OverridableMapping, OVERRIDABLE_D)
 
-    lowest_priority = {"foo": {"c": 111}, "bar": {"b": "two"}, "baz": {"a": [4, 5, 6]}}
 
-    merged = ubimaior.MergedMapping(
-        [
-            ("highest", highest_priority),
-            ("middle", middle_priority),
-            ("lowest", lowest_priority),
-        ]
-    )
+#: Values in the scopes of "mapping_nc" after writing a key, when it is a MergedMapping
+MERGED_SCOPES_AFTER_WRITE = {
+    "foo": {"highest": 11, "middle": 6},
+    "bar": {"middle": "overwritten", "lowest": "4"},
+    "baz": {"middle": True, "lowest": False},
+}
 
-    return merged
 
+#: Content of the "middle" scope of overridable_d, once flattened
+FLAT_MIDDLE_D = {"foo:": {"a": 1, "b": {"xx": 1}, "c": 2}}
 
-@pytest.fixture()
-def overridable_l():
-    """An instance of a merged mapping, with list values."""
-    highest_priority = {"foo": [11, 22], "baz": [1, 2, 3], "foobar": []}
+#: Same as above, after writing "foo/b/yy" and "bar" in the scratch scope
+FLAT_MIDDLE_D_MODIFIED = {
+    "foo:": {"a": 1, "b": {"xx": 1, "yy:": 2}, "c": 2},
+    "bar:": {"a": 1, "b": 2},
+}
 
-    middle_priority = {"foo:": ["a", "b"], "bar": ["a"]}
 
-    lowest_priority = {
-        "foo": [111],
-        "bar": ["b"],  # type(bar) is always a string
-        "baz": [4, 5, 6],
-    }
+def _assert_flattened_onto_middle(overridable, expected_middle):
+    """Flattens a mapping onto its "middle" scope once, and checks the result."""
+    flattened = overridable.flattened(target="middle")
+    assert len(flattened.mappings) == 3
+    assert flattened.middle == expected_middle
+    assert flattened == overridable
 
-    merged = ubimaior.OverridableMapping(
-        [
-            ("highest", highest_priority),
-            ("middle", middle_priority),
-            ("lowest", lowest_priority),
-        ]
-    )
 
-    return merged
+def _set_to_none(mapping, key):
+    mapping[key] = None
 
 
-@pytest.fixture()
-def overridable_d():
-    """An instance of a merged mapping, with dict values."""
-    highest_priority = {
-        "foo": {"a": 1, "b": {"xx": 1}},
-    }
+def _assert_merged(mapping, key, value):
+    # MergedMapping writes directly in the input mappings
+    expected = MERGED_SCOPES_AFTER_WRITE[key]
+    assert value in expected.values()
+    assert {scope: m[key] for scope, m in mapping.mappings.items() if key in m} == expected
 
-    middle_priority = {
-        "foo:": {"c": 2},
-    }
 
-    lowest_priority = {
-        "foo": {"d": 3},
-    }
+def _assert_overridable(mapping, key, value):
+    # OverridableMapping uses a top layer to override the overall result in the view
+    assert mapping.mappings[SCRATCH_KEY][key + ":"] == value
 
-    merged = ubimaior.OverridableMapping(
-        [
-            ("highest", highest_priority),
-            ("middle", middle_priority),
-            ("lowest", lowest_priority),
-        ]
-    )
 
-    return merged
+#: Checks on where values are written, for each type of mapping
+ASSERT_WRITTEN = {
+    ubimaior.MergedMapping: _assert_merged,
+    ubimaior.OverridableMapping: _assert_overridable,
+}
 
 
+@pytest.mark.parametrize(
+    "mapping_type",
+    [ubimaior.MergedMapping, ubimaior.OverridableMapping],
+    ids=["merged", "overridable"],
+)
 class TestAllMappings(object):
     def test_errors_on_init(self, mapping_type):
         # not a list
-        with pytest.raises(TypeError) as excinfo:
+        with pytest.raises(TypeError, match='"mappings" should be a list'):
             mapping_type("not_the_correct_type")
-        assert '"mappings" should be a list' in str(excinfo.value)
 
         # items are not of the correct type
-        with pytest.raises(TypeError) as excinfo:
+        with pytest.raises(TypeError, match='items in "mappings" should be'):
             mapping_type([1, 2, 3])
-        assert 'items in "mappings" should be' in str(excinfo.value)
 
     def test_reading_non_container_types(self, mapping_nc):
 
-        assert mapping_nc["foo"] == 1
-        assert mapping_nc["bar"] == "this_is_bar"
+        assert (mapping_nc["foo"], mapping_nc["bar"]) == (1, "this_is_bar")
         assert mapping_nc["baz"] is False
 
         with pytest.raises(KeyError):
             mapping_nc["this_key_does_not_exit"]
 
-    def test_setting_non_container_types(self, mapping_nc):
+    def test_setting_non_container_types(self, mapping_type, mapping_nc):
+        assert_written = ASSERT_WRITTEN[mapping_type]
 
         mapping_nc.preferred_scope = "middle"
 
         mapping_nc["foo"] = 11
         assert mapping_nc["foo"] == 11
-
-        # OverridableMapping uses a top layer to override
-        # the overall result in the view
-        if isinstance(mapping_nc, ubimaior.OverridableMapping):
-            assert mapping_nc.mappings[ubimaior.OverridableMapping.scratch_key]["foo:"] == 11
-
-        # MergedMapping instead writes directly in the input mappings
-        if isinstance(mapping_nc, ubimaior.MergedMapping):
-            assert mapping_nc.mappings["highest"]["foo"] == 11
-            assert mapping_nc.mappings["middle"]["foo"] == 6
+        assert_written(mapping_nc, "foo", 11)
 
         mapping_nc["bar"] = "overwritten"
         assert mapping_nc["bar"] == "overwritten"
-
-        if isinstance(mapping_nc, ubimaior.OverridableMapping):
-            assert (
-                mapping_nc.mappings[ubimaior.OverridableMapping.scratch_key]["bar:"]
-                == "overwritten"
-            )
-
-        if isinstance(mapping_nc, ubimaior.MergedMapping):
-            assert "bar" not in mapping_nc.mappings["highest"]
-            assert mapping_nc.mappings["middle"]["bar"] == "overwritten"
-            assert mapping_nc.mappings["lowest"]["bar"] == "4"
+        assert_written(mapping_nc, "bar", "overwritten")
 
         assert "baz" not in mapping_nc.mappings["middle"]
         mapping_nc["baz"] = True
         assert mapping_nc["baz"] is True
+        assert_written(mapping_nc, "baz", True)
 
-        if isinstance(mapping_nc, ubimaior.OverridableMapping):
-            assert mapping_nc.mappings[ubimaior.OverridableMapping.scratch_key]["baz:"] is True
-
-        if isinstance(mapping_nc, ubimaior.MergedMapping):
-            assert "baz" not in mapping_nc.mappings["highest"]
-            assert mapping_nc.mappings["middle"]["baz"] is True
-            assert mapping_nc.mappings["lowest"]["baz"] is False
-
-        with pytest.raises(TypeError) as excinfo:
+        with pytest.raises(TypeError, match="cannot assign value of type"):
             mapping_nc["foo"] = "a_string"
-        assert "cannot assign value of type" in str(excinfo.value)
 
     def test_deleting_types(self, mapping_nc):
 
         mapping_nc.preferred_scope = "middle"
+        mappings = mapping_nc.mappings
 
-        for key in ("foo", "bar", "baz"):
+        for key in EXPECTED_KEYS:
             assert key in mapping_nc
             del mapping_nc[key]
             assert key not in mapping_nc
-            for v in mapping_nc.mappings.values():
-                assert key not in v
+            assert not any(key in v for v in mappings.values())
 
     def test_iteration(self, mapping_nc):
 
-        for key, expected in zip(mapping_nc, ["foo", "bar", "baz"]):
+        for key, expected in zip(mapping_nc, EXPECTED_KEYS):
             assert key == expected
 
-        assert list(mapping_nc.keys()) == ["foo", "bar", "baz"]
+        assert list(mapping_nc.keys()) == EXPECTED_KEYS
 
     def test_accessing_non_existing_attribute(self, mapping_nc):
-        with pytest.raises(AttributeError) as excinfo:
+        with pytest.raises(AttributeError, match="object has no attribute"):
             mapping_nc.does_not_exist
-        assert "object has no attribute" in str(excinfo.value)
 
 
 class TestMergedMapping(object):
     def test_errors_on_init(self):
         # one or more mapping is needed
-        with pytest.raises(ValueError) as excinfo:
+        with pytest.raises(ValueError, match='"mappings" should contain one or more'):
             ubimaior.MergedMapping([])
-        assert '"mappings" should contain one or more' in str(excinfo.value)
 
     def test_reading_lists(self, mapping_l):
-        assert mapping_l["foo"][:] == [1, 11, 111]
-        assert mapping_l["baz"][:] == [1, 2, 3, 4, 5, 6]
-        assert mapping_l["foobar"][:] == []
-        assert mapping_l["bar"][:] == ["a", "b"]
+        merged_lists = {key: mapping_l[key][:] for key in mapping_l}
+        assert merged_lists == {
+            "foo": [1, 11, 111],
+            "baz": EXPECTED_BAZ,
+            "foobar": [],
+            "bar": ["a", "b"],
+        }
 
     def test_reading_dicts(self, mapping_d):
 
         assert len(mapping_d) == 3
 
-        assert mapping_d["foo"]["a"] == 1
-        assert mapping_d["foo"]["b"] == 22
-        assert mapping_d["foo"]["c"] == 111
-        assert len(mapping_d["foo"]) == 3
+        foo = mapping_d["foo"]
+        assert (foo["a"], foo["b"], foo["c"], len(foo)) == (1, 22, 111, 3)
 
-        assert mapping_d["baz"]["a"][:] == [1, 2, 3, 4, 5, 6]
-        assert len(mapping_d["baz"]) == 1
+        baz = mapping_d["baz"]
+        assert (baz["a"][:], len(baz)) == (EXPECTED_BAZ, 1)
 
-        assert mapping_d["bar"]["a"] == "one"
-        assert mapping_d["bar"]["b"] == "two"
-        assert len(mapping_d["bar"]) == 2
+        bar = mapping_d["bar"]
+        assert (bar["a"], bar["b"], len(bar)) == ("one", "two", 2)
 
     def test_errors_when_reading(self):
         """Tests all the errors that may happen when reading from a mapping."""
         # Type mismatch on a key
         merged = ubimaior.MergedMapping([("high", {"foo": 1}), ("low", {"foo": "bar"})])
 
-        with pytest.raises(TypeError, match="type mismatch for key") as excinfo:
+        with pytest.raises(TypeError, match="type mismatch for key"):
             merged["foo"]
 
     def test_setting_invalid_preferred_scope(self, mapping_l):
-        with pytest.raises(ValueError) as excinfo:
+        with pytest.raises(ValueError, match="is an invalid value for preferred scope"):
             mapping_l.preferred_scope = "does_not_exist"
-        assert "is an invalid value for preferred scope" in str(excinfo.value)
 
-    def test_setting_containers(self, mapping_l):
+    def test_setting_containers(self, mapping_l_rw):
+
+        mappings = mapping_l_rw.mappings
 
-        mapping_l["foo"] = [1, 2, 3]
-        assert list(mapping_l["foo"]) == [1, 2, 3]
-        assert mapping_l.mappings["highest"]["foo"] == [1, 2, 3]
-        assert "foo" not in mapping_l.mappings["middle"]
-        assert "foo" not in mapping_l.mappings["lowest"]
+        mapping_l_rw["foo"] = [1, 2, 3]
+        assert list(mapping_l_rw["foo"]) == [1, 2, 3]
+        assert mappings["highest"]["foo"] == [1, 2, 3]
+        assert "foo" not in mappings["middle"]
+        assert "foo" not in mappings["lowest"]
 
-        mapping_l.preferred_scope = "middle"
-        mapping_l["baz"] = [1, 2, 3]
-        assert list(mapping_l["baz"]) == [1, 2, 3]
-        assert "baz" not in mapping_l.mappings["highest"]
-        assert mapping_l.mappings["middle"]["baz"] == [1, 2, 3]
-        assert "baz" not in mapping_l.mappings["lowest"]
+        mapping_l_rw.preferred_scope = "middle"
+        mapping_l_rw["baz"] = [1, 2, 3]
+        assert list(mapping_l_rw["baz"]) == [1, 2, 3]
+        assert "baz" not in mappings["highest"]
+        assert mappings["middle"]["baz"] == [1, 2, 3]
+        assert "baz" not in mappings["lowest"]
 
 
 class TestOverridableMapping(object):
     def test_reading_lists(self, overridable_l):
+        merged_lists = {key: list(overridable_l[key]) for key in overridable_l}
         # foo is overridden
-        assert list(overridable_l["foo"]) == [11, 22, "a", "b"]
+        assert merged_lists["foo"] == [11, 22, "a", "b"]
 
         # bar and baz should behave as MergedSequence
-        assert list(overridable_l["baz"]) == [1, 2, 3, 4, 5, 6]
-        assert list(overridable_l["bar"]) == ["a", "b"]
+        assert merged_lists["baz"] == EXPECTED_BAZ
+        assert merged_lists["bar"] == ["a", "b"]
 
     def test_views_are_immutable(self, overridable_l):
         with pytest.raises(AttributeError):
@@ -300,73 +299,65 @@ class TestOverridableMapping(object):
         with pytest.raises(TypeError):
             del overridable_l["foo"][0]
 
-    def test_setting_lists(self, overridable_l):
+    def test_setting_lists(self, overridable_l_rw):
 
-        overridable_l["foo"] = [1, 2, 3]
+        overridable_l_rw["foo"] = [1, 2, 3]
 
-        assert list(overridable_l["foo"]) == [1, 2, 3]
-        assert overridable_l.scratch["foo:"] == [1, 2, 3]
-        assert overridable_l.highest["foo"] == [11, 22]
+        assert list(overridable_l_rw["foo"]) == [1, 2, 3]
+        assert overridable_l_rw.scratch["foo:"] == [1, 2, 3]
+        assert overridable_l_rw.highest["foo"] == [11, 22]
 
     def test_setting_dicts(self, overridable_d):
 
-        assert dict(overridable_d["foo"].items()) == {"a": 1, "b": {"xx": 1}, "c": 2}
+        assert overridable_d["foo"] == {"a": 1, "b": {"xx": 1}, "c": 2}
         # Getting a key creates an empty dictionary in scratch
         assert overridable_d.scratch["foo"] == {"b": {}}
 
         # Setting nested keys
         overridable_d["foo"]["c"] = 4
         # assert overridable_d.scratch
-        assert dict(overridable_d["foo"].items()) == {"a": 1, "b": {"xx": 1}, "c": 4}
+        assert overridable_d["foo"] == {"a": 1, "b": {"xx": 1}, "c": 4}
         assert overridable_d.scratch["foo"] == {"b": {}, "c:": 4}
 
         overridable_d["foo"] = {"a": 1}
-        assert dict(overridable_d["foo"].items()) == {"a": 1}
+        assert overridable_d["foo"] == {"a": 1}
         assert overridable_d.highest["foo"] == {"a": 1, "b": {"xx": 1}}
 
-    def test_using_invalid_keys(self, overridable_d):
-
-        with pytest.raises(TypeError) as excinfo:
-            key = (1, 2)
-            overridable_d[key] = None
-        msg = str(excinfo.value)
-        assert "unsupported key type" in msg
-
-        with pytest.raises(TypeError) as excinfo:
-            key = (1, 2)
-            overridable_d[key]
-        msg = str(excinfo.value)
-        assert "unsupported key type" in msg
-
-        with pytest.raises(ValueError) as excinfo:
-            overridable_d["foo:"] = None
-        msg = str(excinfo.value)
-        assert "a key cannot end with a" in msg
-
-    def test_flattening_errors(self, overridable_l):
-
-        # Check that type errors are raise correctly
-        with pytest.raises(TypeError):
-            overridable_l.flattened(1)
+    @pytest.mark.parametrize(
+        "operation,key,exc_type,msg",
+        [
+            (_set_to_none, (1, 2), TypeError, "unsupported key type"),
+            (operator.getitem, (1, 2), TypeError, "unsupported key type"),
+            (_set_to_none, "foo:", ValueError, "a key cannot end with a"),
+        ],
+        ids=["set-tuple", "get-tuple", "set-override"],
+    )
+    def test_using_invalid_keys(self, overridable_l, operation, key, exc_type, msg):
+        # Keys are checked before the mapping is accessed, so the shared fixture is not modified
+        with pytest.raises(exc_type, match=msg):
+            operation(overridable_l, key)
 
-        # Check that value errors are raised correctly
-        with pytest.raises(ValueError):
-            overridable_l.flattened(target="doesnotexist")
+    @pytest.mark.parametrize(
+        "target,exc_type", [(1, TypeError), ("doesnotexist", ValueError)], ids=["type", "value"]
+    )
+    def test_flattening_errors(self, overridable_l, target, exc_type):
+        with pytest.raises(exc_type):
+            overridable_l.flattened(target=target)
 
-    def test_flattening_lists(self, overridable_l):
+    def test_flattening_lists(self, overridable_l_rw):
 
         # Write a scalar type into the map
-        overridable_l["fee"] = 1
-        assert overridable_l.scratch["fee:"] == 1
+        overridable_l_rw["fee"] = 1
+        assert overridable_l_rw.scratch["fee:"] == 1
 
         # Flatten scratch onto the highest layer
-        flattened = overridable_l.flattened()
+        flattened = overridable_l_rw.flattened()
         assert len(flattened.scratch) == 0
         assert flattened["fee"] == 1
         assert flattened.highest["fee:"] == 1
 
         # Flatten everything onto middle
-        flattened = overridable_l.flattened(target="middle")
+        flattened = overridable_l_rw.flattened(target="middle")
         assert len(flattened.scratch) == 0
         assert flattened["fee"] == 1
         assert "highest" not in flattened.mappings
@@ -377,25 +368,17 @@ class TestOverridableMapping(object):
 
     def test_flattening_dictionaries(self, overridable_d):
         # Check flattening a dictionary without writing to scratch
-        flattened = overridable_d.flattened(target="middle")
-        assert len(flattened.mappings) == 3
-        assert flattened.middle == {"foo:": {"a": 1, "b": {"xx": 1}, "c": 2}}
-        assert flattened == overridable_d
+        _assert_flattened_onto_middle(overridable_d, FLAT_MIDDLE_D)
 
         # Write something to scratch and check again the flattening
         overridable_d["foo"]["b"]["yy"] = 2
         overridable_d["bar"] = {"a": 1, "b": 2}
-        flattened = overridable_d.flattened(target="middle")
-        assert len(flattened.mappings) == 3
-        assert flattened.middle == {
-            "foo:": {"a": 1, "b": {"xx": 1, "yy:": 2}, "c": 2},
-            "bar:": {"a": 1, "b": 2},
-        }
-        assert flattened == overridable_d
+        _assert_flattened_onto_middle(overridable_d, FLAT_MIDDLE_D_MODIFIED)
 
         # Check that also non-container types are handled correctly
-        overridable_d.mappings["highest"]["babau"] = 1
-        overridable_d.mappings["middle"]["babau"] = 2
+        mappings = overridable_d.mappings
+        mappings["highest"]["babau"] = 1
+        mappings["middle"]["babau"] = 2
         flattened = overridable_d.flattened(target="middle")
         assert flattened["babau"] == 1
         assert "babau" in flattened.middle
@@ -1,38 +1,80 @@
 # -*- coding: utf-8 -*-
 """Unit tests for sequence classes"""
 
+import itertools
+
 import ubimaior
 
 import pytest
 
+#: Components of the merged sequence used in tests, stored as tuples
+#: so that they can't be modified by mistake
+COMPONENTS = ((1, 2, 3), ("a", "b", "c"), (False, True, None), (1, "a", False))
+
+#: The same items as a single flat sequence
+FLAT_COMPONENTS = tuple(itertools.chain.from_iterable(COMPONENTS))
+
+
+def _build(components):
+    return ubimaior.MergedMutableSequence([list(c) for c in components])
+
+
+def _list_after_setting(sl, vl):
+    """Returns what a built-in list would be after assigning vl to sl"""
+    result = list(FLAT_COMPONENTS)
+    result[sl] = vl
+    return result
+
+
+def _list_after_deleting(sl):
+    """Returns what a built-in list would be after deleting sl"""
+    result = list(FLAT_COMPONENTS)
+    del result[sl]
+    return result
+
+
+def _list_after_inserting(idx, vl):
+    """Returns what a built-in list would be after inserting vl at idx"""
+    result = list(FLAT_COMPONENTS)
+    result.insert(idx, vl)
+    return result
+
 
 @pytest.fixture()
 def sequence():
-    """An instance of a merged sequence"""
-    return ubimaior.MergedMutableSequence(
-        [[1, 2, 3], ["a", "b", "c"], [False, True, None], [1, "a", False]]
-    )
+    """An instance of a merged sequence, built anew for each test"""
+    return _build(COMPONENTS)
+
+
+@pytest.fixture(scope="module")
+def ro_sequence():
+    """An instance of a merged sequence shared among tests that don't modify it"""
+    return _build(COMPONENTS)
 
 
-def test_errors_on_init():
+@pytest.mark.parametrize(
+    "sequence_type",
+    [ubimaior.MergedSequence, ubimaior.MergedMutableSequence],
+    ids=["immutable", "mutable"],
+)
+def test_errors_on_init(sequence_type):
     # not a list
-    with pytest.raises(TypeError) as excinfo:
-        ubimaior.MergedMutableSequence("not_the_correct_type")
-    assert '"sequences" should be a list' in str(excinfo.value)
+    with pytest.raises(TypeError, match='"sequences" should be a list'):
+        sequence_type("not_the_correct_type")
 
     # items are not of the correct type
-    with pytest.raises(TypeError) as excinfo:
-        ubimaior.MergedMutableSequence([1, 2, 3])
-    assert 'items in "sequences" should be' in str(excinfo.value)
+    with pytest.raises(TypeError, match='items in "sequences" should be'):
+        sequence_type([1, 2, 3])
 
+
+def test_init_from_tuples():
     # a MergedSequence can be built using tuples
     mrs = ubimaior.MergedSequence([(1, 2), (3, 4)])
     assert [1, 2, 3, 4] == list(mrs)
 
     # a MergedMutableSequence cannot
-    with pytest.raises(TypeError) as excinfo:
+    with pytest.raises(TypeError, match='items in "sequences" should be'):
         ubimaior.MergedMutableSequence([(1, 2), (3, 4)])
-    assert 'items in "sequences" should be' in str(excinfo.value)
 
 
 def test_type_when_getting_slices():
@@ -45,27 +87,28 @@ def test_type_when_getting_slices():
     assert isinstance(nonmut[2:], list)
 
 
-def test_getting_items(sequence):
+def test_getting_items(ro_sequence):
     # Length is the sum of the lengths of items
-    assert len(sequence) == 12
+    assert len(ro_sequence) == 12
 
     # Getting items should work like in built-in lists
-    assert sequence[:3] == [1, 2, 3]
-    assert sequence[:4] == [1, 2, 3, "a"]
-    assert sequence[::2] == [1, 3, "b", False, None, "a"]
-    assert sequence[0] == 1
-    assert sequence[6] is False
-    assert sequence[11] == sequence[-1]
+    assert ro_sequence[:3] == [1, 2, 3]
+    assert ro_sequence[:4] == [1, 2, 3, "a"]
+    assert ro_sequence[::2] == [1, 3, "b", False, None, "a"]
+    assert ro_sequence[0] == 1
+    assert ro_sequence[6] is False
+    assert ro_sequence[11] == ro_sequence[-1]
+
+    assert list(itertools.islice(reversed(ro_sequence), 3)) == [False, "a", 1]
 
-    assert list(reversed(sequence))[:3] == [False, "a", 1]
+    with pytest.raises(IndexError, match="list index out of range"):
+        ro_sequence[12]
 
-    with pytest.raises(IndexError) as excinfo:
-        sequence[12]
-    assert "list index out of range" in str(excinfo.value)
+    with pytest.raises(IndexError, match="list index out of range"):
+        ro_sequence[-13]
 
-    with pytest.raises(TypeError) as excinfo:
-        sequence["a"]
-    assert "list indices must be integers or slices" in str(excinfo.value)
+    with pytest.raises(TypeError, match="list indices must be integers or slices"):
+        ro_sequence["a"]
 
 
 def test_modifying_mutable_items():
@@ -81,202 +124,145 @@ def test_modifying_mutable_items():
 
 
 def test_setting_single_items(sequence):
-    originals = sequence.sequences[:]
-
     sequence[1] = "d"
     assert sequence[1] == "d"
-    assert originals[0][1] == "d"
+    assert sequence.sequences[0][1] == "d"
 
     sequence[4] = "z"
     assert sequence[4] == "z"
-    assert originals[1][1] == "z"
+    assert sequence.sequences[1][1] == "z"
 
     sequence[-1] = "z"
     assert sequence[-1] == "z"
-    assert originals[3][2] == "z"
-
-
-def test_error_setting_slices(sequence):
-    with pytest.raises(TypeError) as excinfo:
-        sequence[0:] = 1
-    assert "can only assign an iterable" in str(excinfo.value)
-
-    with pytest.raises(ValueError) as excinfo:
-        sequence[-4:-8:-1] = [1, 2, 3, 4, 5]
-    assert "attempt to use an extended slice with step" in str(excinfo.value)
+    assert sequence.sequences[3][2] == "z"
+
+
+def test_error_setting_slices(ro_sequence):
+    with pytest.raises(TypeError, match="can only assign an iterable"):
+        ro_sequence[0:] = 1
+
+    with pytest.raises(ValueError, match="attempt to use an extended slice with step"):
+        ro_sequence[-4:-8:-1] = [1, 2, 3, 4, 5]
+
+
+#: Slice, value assigned to it and expected components afterwards
+SETTING_SLICE_CASES = (
+    (
+        slice(1, 7),
+        (2, 3, 4, 5, 6, 7, 8),
+        ((1, 2, 3), (4, 5, 6), (7, 8, True, None), (1, "a", False)),
+    ),
+    (
+        slice(11, 5),
+        (101, 102),
+        ((1, 2, 3), ("a", "b", "c"), (False, True, None), (1, "a", 101, 102, False)),
+    ),
+    (
+        slice(7, 4),
+        (101, 102),
+        ((1, 2, 3), ("a", "b", "c"), (False, 101, 102, True, None), (1, "a", False)),
+    ),
+    (
+        slice(-8, -4),
+        (1, 2, 3, 4, 5),
+        ((1, 2, 3), ("a", 1, 2), (3, 4, 5, None), (1, "a", False)),
+    ),
+    # (slice(None, None, 2), (101, 102, 103, 104, 105, 106), (
+    #     (101, 2, 102),
+    #     ('a', 103, 'c'),
+    #     (104, True, 105),
+    #     (1, 106, False)
+    # )),
+    # (slice(-4, -8, -1), (1, 2, 3, 4), (
+    #     (1, 2, 3),
+    #     ('a', 'b', 4),
+    #     (3, 1, 1),
+    #     (1, 'a', False)
+    # )),
+)
 
 
-@pytest.mark.parametrize(
-    "sl,vl,expected_components",
-    [
-        (
-            slice(1, 7),
-            [2, 3, 4, 5, 6, 7, 8],
-            [[1, 2, 3], [4, 5, 6], [7, 8, True, None], [1, "a", False]],
-        ),
-        (
-            slice(11, 5),
-            [101, 102],
-            [
-                [1, 2, 3],
-                ["a", "b", "c"],
-                [False, True, None],
-                [1, "a", 101, 102, False],
-            ],
-        ),
-        (
-            slice(7, 4),
-            [101, 102],
-            [
-                [1, 2, 3],
-                ["a", "b", "c"],
-                [False, 101, 102, True, None],
-                [1, "a", False],
-            ],
-        ),
-        (
-            slice(-8, -4),
-            [1, 2, 3, 4, 5],
-            [[1, 2, 3], ["a", 1, 2], [3, 4, 5, None], [1, "a", False]],
-        ),
-        # (slice(None, None, 2), [101, 102, 103, 104, 105, 106], [
-        #     [101, 2, 102],
-        #     ['a', 103, 'c'],
-        #     [104, True, 105],
-        #     [1, 106, False]
-        # ]),
-        # (slice(-4, -8, -1), [1, 2, 3, 4], [
-        #     [1, 2, 3],
-        #     ['a', 'b', 4],
-        #     [3, 1, 1],
-        #     [1, 'a', False]
-        # ]),
-    ],
-)
+@pytest.mark.parametrize("sl,vl,expected_components", SETTING_SLICE_CASES)
 def test_setting_slices(sequence, sl, vl, expected_components):
-    originals = sequence.sequences[:]
+    # The value is split among components, so pass it as a list
+    sequence[sl] = list(vl)
 
     # Check that we behave like a list
-    normal_list = list(sequence)
-    normal_list[sl] = vl
-    sequence[sl] = vl
-
-    assert list(sequence) == normal_list
+    assert list(sequence) == _list_after_setting(sl, vl)
 
     # Check that the components are modified as we expect
-    for component, expected in zip(originals, expected_components):
-        assert component == expected
+    assert tuple(map(tuple, sequence.sequences)) == expected_components
 
 
 def test_deleting_single_items(sequence):
-    originals = sequence.sequences[:]
-
     with pytest.raises(IndexError):
         del sequence[20]
 
-    assert len(originals[1]) == 3
+    assert len(sequence.sequences[1]) == 3
     del sequence[4]
-    assert len(originals[1]) == 2
-    assert originals[1] == ["a", "c"]
+    assert len(sequence.sequences[1]) == 2
+    assert sequence.sequences[1] == ["a", "c"]
 
-    assert len(originals[3]) == 3
+    assert len(sequence.sequences[3]) == 3
     del sequence[-2]
-    assert len(originals[3]) == 2
-    assert originals[3] == [1, False]
+    assert len(sequence.sequences[3]) == 2
+    assert sequence.sequences[3] == [1, False]
 
 
-@pytest.mark.parametrize(
-    "sl,expected_components",
-    [
-        (slice(1, 7), [[1], [], [True, None], [1, "a", False]]),
-        (
-            slice(11, 5),
-            [[1, 2, 3], ["a", "b", "c"], [False, True, None], [1, "a", False]],
-        ),
-        (slice(-8, -4), [[1, 2, 3], ["a"], [None], [1, "a", False]]),
-    ],
+#: Slice to be deleted and expected components afterwards
+DELETING_SLICE_CASES = (
+    (slice(1, 7), ((1,), (), (True, None), (1, "a", False))),
+    (slice(11, 5), COMPONENTS),
+    (slice(-8, -4), ((1, 2, 3), ("a",), (None,), (1, "a", False))),
 )
-def test_deleting_slices(sequence, sl, expected_components):
-    originals = sequence.sequences[:]
 
-    # Check that we behave like a list
-    normal_list = list(sequence)
-    del normal_list[sl]
+
+@pytest.mark.parametrize("sl,expected_components", DELETING_SLICE_CASES)
+def test_deleting_slices(sequence, sl, expected_components):
     del sequence[sl]
 
-    assert list(sequence) == normal_list
+    # Check that we behave like a list
+    assert list(sequence) == _list_after_deleting(sl)
 
     # Check that the components are modified as we expect
-    for component, expected in zip(originals, expected_components):
-        assert component == expected
+    assert tuple(map(tuple, sequence.sequences)) == expected_components
 
 
-@pytest.mark.parametrize(
-    "idx,vl,expected_components",
-    [
-        (
-            0,
-            101,
-            [[101, 1, 2, 3], ["a", "b", "c"], [False, True, None], [1, "a", False]],
-        ),
-        (
-            12,
-            101,
-            [[1, 2, 3], ["a", "b", "c"], [False, True, None], [1, "a", False, 101]],
-        ),
-        (
-            26,
-            101,
-            [[1, 2, 3], ["a", "b", "c"], [False, True, None], [1, "a", False, 101]],
-        ),
-        # Testing negative index
-        (
-            -1,
-            101,
-            [[1, 2, 3], ["a", "b", "c"], [False, True, None], [1, "a", 101, False]],
-        ),
-        (
-            -25,
-            101,
-            [[101, 1, 2, 3], ["a", "b", "c"], [False, True, None], [1, "a", False]],
-        ),
-    ],
+#: Index, value inserted there and expected components afterwards
+INSERTION_CASES = (
+    (0, 101, ((101, 1, 2, 3), ("a", "b", "c"), (False, True, None), (1, "a", False))),
+    (12, 101, ((1, 2, 3), ("a", "b", "c"), (False, True, None), (1, "a", False, 101))),
+    (26, 101, ((1, 2, 3), ("a", "b", "c"), (False, True, None), (1, "a", False, 101))),
+    # Testing negative index
+    (-1, 101, ((1, 2, 3), ("a", "b", "c"), (False, True, None), (1, "a", 101, False))),
+    (-25, 101, ((101, 1, 2, 3), ("a", "b", "c"), (False, True, None), (1, "a", False))),
 )
-def test_insertion(sequence, idx, vl, expected_components):
-    originals = sequence.sequences[:]
 
-    # Check that we behave like a list
-    normal_list = list(sequence)
-    normal_list.insert(idx, vl)
+
+@pytest.mark.parametrize("idx,vl,expected_components", INSERTION_CASES)
+def test_insertion(sequence, idx, vl, expected_components):
     sequence.insert(idx, vl)
 
-    assert list(sequence) == normal_list
+    # Check that we behave like a list
+    assert list(sequence) == _list_after_inserting(idx, vl)
 
     # Check that the components are modified as we expect
-    for component, expected in zip(originals, expected_components):
-        assert component == expected
-
+    assert tuple(map(tuple, sequence.sequences)) == expected_components
 
-def test_insertion_errors(sequence):
-    with pytest.raises(TypeError) as excinfo:
-        sequence.insert("a", 101)
-    msg = str(excinfo.value)
-    assert "'str' object cannot be interpreted as an integer" == msg
 
+def test_insertion_errors(ro_sequence):
+    with pytest.raises(TypeError, match="^'str' object cannot be interpreted as an integer$"):
+        ro_sequence.insert("a", 101)
 
-def test_equality(sequence):
-    normal_list = sequence[:]
-
-    another_sequence = ubimaior.MergedMutableSequence(
-        [[1, 2, 3], ["a", "b", "c"], [False, True, None], [1, "a", False]]
-    )
 
+def test_equality(ro_sequence):
     # Equality constructing a list
-    assert list(sequence) == normal_list
+    assert list(ro_sequence) == list(FLAT_COMPONENTS)
 
     # Equality with the same type
-    assert sequence == another_sequence
-    assert another_sequence == sequence
+    another_sequence = _build(COMPONENTS)
+    assert ro_sequence == another_sequence
+    assert another_sequence == ro_sequence
 
     not_really_equal = ubimaior.MergedMutableSequence(
         [[1, 2], [3, "a", "b", "c"], [False], [True, None, 1, "a", False]]
@@ -284,8 +270,8 @@ def test_equality(sequence):
 
     # Test that distribution of values in items
     # enters comparison for MergedSequence objects
-    assert list(not_really_equal) == sequence[:]
-    assert not_really_equal != sequence
-    assert sequence != not_really_equal
+    assert list(not_really_equal) == list(ro_sequence)
+    assert not_really_equal != ro_sequence
+    assert ro_sequence != not_really_equal
 
-    assert sequence != [1, 2, 3, 4]
+    assert ro_sequence != [1, 2, 3, 4]
@@ -85,12 +85,25 @@ def show(validate, blame, name):
 
     if blame:
         scopes = format_provenance(provenance)
-        formatted_cfg_str = [p + line for p, line in zip(scopes, cfg_lines)]
-        formatted_cfg_str = "\n".join(formatted_cfg_str)
-    else:
-        formatted_cfg_str = "\n".join(x for x in cfg_lines)
+        cfg_lines = (p + line for p, line in zip(scopes, cfg_lines))
 
-    click.echo_via_pager(formatted_cfg_str)
+    click.echo_via_pager(_join_lines(cfg_lines))
+
+
+def _join_lines(lines):
+    """Yields the lines passed as argument separated by newlines, without
+    building the whole text in memory.
+
+    Args:
+        lines (iterable): lines to be joined
+
+    Returns:
+        generator over the chunks of text
+    """
+    lines = iter(lines)
+    yield next(lines, "")
+    for line in lines:
+        yield "\n" + line
 
 
 def format_provenance(provenance):
@@ -104,19 +117,21 @@ def format_provenance(provenance):
     """
     # Construct a color map for the scopes
     colors = ["red", "green", "blue", "magenta", "cyan", "white", "black"]
-    items = sorted(set(itertools.chain.from_iterable(provenance)))
-    color_map = dict(zip(items, colors))
-
-    # Style all the scopes according to the colormap
-    scopes = [
-        click.style("[[", bold=True)
+    # Colors are reused if there are more scopes than colors
+    items = sorted({x for scope in provenance for x in scope})
+    color_map = dict(zip(items, itertools.cycle(colors)))
+
+    # Style all the scopes according to the colormap. Brackets are the same for
+    # every line, and the width of a line is that of its unstyled scopes.
+    open_bracket, close_bracket = click.style("[[", bold=True), click.style("]]", bold=True)
+    raw_lengths = [len(",".join(scope)) for scope in provenance]
+    max_width = max(raw_lengths)
+    return [
+        open_bracket
         + ",".join(click.style(x, fg=color_map[x]) for x in scope)
-        + click.style("]]", bold=True)
+        + close_bracket
         + "  "
-        for scope in provenance
+        + " " * (max_width - raw_length)
+        + "|"
+        for scope, raw_length in zip(provenance, raw_lengths)
     ]
-
-    raw_lengths = [len(",".join(x)) for x in provenance]
-    max_width = max(raw_lengths)
-    spaces_to_add = [max_width - x for x in raw_lengths]
-    return [val + " " * spacer + "|" for val, spacer in zip(scopes, spaces_to_add)]
@@ -1,42 +1,65 @@
 # -*- coding: utf-8 -*-
 """I/O of hierarchical configurations in various formats."""
 
+import collections
+import copy
+import functools
+import itertools
+import json
 import os.path
-
-import jsonschema
-import six
+import stat
+import threading
 
 import ubimaior.formats
 import ubimaior.mappings
 
+#: A scope in a hierarchical configuration, with its name and the directory of its files
+Scope = collections.namedtuple("Scope", ["name", "path"])
+
 
 class ConfigSettings(ubimaior.mappings.MutableMapping):
     """Manages the settings for hierarchical configurations."""
 
+    # Settings are stored in slots, so that reading them is a plain attribute access
+    __slots__ = ("scopes", "format", "schema")
+
     #: Settings that are currently permitted
-    valid_settings = ("scopes", "format", "schema")
+    valid_settings = frozenset(__slots__)
+
+    #: Error message for settings that are not permitted
+    _invalid_key_msg = "allowed settings are {0}".format(", ".join(__slots__))
 
     def __init__(self):
-        self._settings = {"scopes": None, "format": None, "schema": None}
+        self.scopes = None
+        self.format = None
+        self.schema = None
 
     def __getitem__(self, key):
         self._validate_key(key)
-        return self._settings[key]
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
 
     def __setitem__(self, key, value):
         self._validate_key(key)
         self._validate_value(key, value)
-        self._settings[key] = value
+        if key == "scopes":
+            value = [Scope(*x) for x in value]
+        setattr(self, key, value)
 
     def __delitem__(self, key):
         self._validate_key(key)
-        del self._settings[key]
+        try:
+            delattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
 
     def __iter__(self):
-        return iter(self._settings)
+        return (key for key in self.__slots__ if hasattr(self, key))
 
     def __len__(self):
-        return len(self._settings)
+        return sum(1 for _ in self)
 
     @staticmethod
     def _validate_value(key, value):
@@ -57,7 +80,7 @@ class ConfigSettings(ubimaior.mappings.MutableMapping):
                 raise TypeError(msg)
 
         if key == "format":
-            if not isinstance(value, six.string_types):
+            if not isinstance(value, str):
                 msg = '"format" must be a valid string'
                 raise TypeError(msg)
 
@@ -67,14 +90,7 @@ class ConfigSettings(ubimaior.mappings.MutableMapping):
 
     def _validate_key(self, key):
         if key not in self.valid_settings:
-            msg = "allowed settings are {0}".format(", ".join(self._settings.keys()))
-            raise KeyError(msg)
-
-    def __getattr__(self, name):
-        if name not in self.valid_settings:
-            msg = "{0} object has no attribute {1}"
-            raise AttributeError(msg.format(type(self).__name__, name))
-        return self._settings[name]
+            raise KeyError(self._invalid_key_msg)
 
 
 #: Default settings for the module
@@ -110,6 +126,9 @@ _UBIMAIOR_CFG_SCHEMA = {
     "required": ["format", "scopes"],
 }
 
+#: Canonical representation of the schema above, used to retrieve its validator
+_UBIMAIOR_CFG_SCHEMA_KEY = json.dumps(_UBIMAIOR_CFG_SCHEMA, sort_keys=True)
+
 
 def setup_from_file(configuration_file):
     """Sets ubimaior global defaults from a configuration file.
@@ -135,12 +154,12 @@ def setup_from_file(configuration_file):
     formatter = ubimaior.formats.FORMATTERS[fmt.strip(".")]
 
     # Load the settings and return them
-    with open(configuration_file) as cfg_stream:
+    with open(configuration_file, encoding="utf-8") as cfg_stream:
         configuration = formatter.load(cfg_stream)
-        jsonschema.validate(configuration, _UBIMAIOR_CFG_SCHEMA)
+    _get_validator(_UBIMAIOR_CFG_SCHEMA_KEY).validate(configuration)
 
     # Ensure that scopes is a list of tuples
-    scopes = [(name, make_abs(d)) for name, d in configuration["scopes"]]
+    scopes = [Scope(name, make_abs(d)) for name, d in configuration["scopes"]]
     set_default_scopes(scopes)
 
     set_default_format(configuration["format"])
@@ -165,7 +184,7 @@ def search_file_in_path(filename, start_dir=None):
     """
     # If the file is given with an absolute path just check it exists (or raise)
     if os.path.isabs(filename):
-        if os.path.exists(filename) and os.path.isfile(filename):
+        if _is_regular_file(filename):
             return filename
         raise IOError("file not found [{0}]".format(filename))
 
@@ -175,22 +194,36 @@ def search_file_in_path(filename, start_dir=None):
 
     while True:
         abs_filename = os.path.join(start_dir, filename)
-        if os.path.exists(abs_filename) and os.path.isfile(abs_filename):
+        if _is_regular_file(abs_filename):
             return abs_filename
 
-        start_dir, is_root = (
-            os.path.dirname(start_dir),
-            os.path.dirname(start_dir) == start_dir,
-        )
-        if is_root:
+        parent = os.path.dirname(start_dir)
+        if parent == start_dir:
             raise IOError("file not found [{0}]".format(filename))
+        start_dir = parent
+
+
+def _is_regular_file(path):
+    """Returns True if path is a regular file, using a single stat call.
+
+    Args:
+        path (str): path to be checked
+
+    Returns:
+        True or False
+    """
+    try:
+        return stat.S_ISREG(os.stat(path).st_mode)
+    except OSError:
+        return False
 
 
 def set_default_scopes(scopes):
     """Sets the default scopes to look for configurations.
 
     Args:
-        scopes (list of tuples): the new scopes to be used as a default
+        scopes (list of tuples): the new scopes to be used as a default,
+            either ``Scope`` objects or ``(name, directory)`` tuples
 
     Raises:
         TypeError: when ``scopes`` is not a list of two elements tuples
@@ -240,10 +273,34 @@ def validate(cfg_object, schema):
         ValueError: if ``schema`` is a file and either the file does not exist or
             its format is not recognized
     """
+    validator = _load_schema(schema)
+    flattened_obj = cfg_object.as_dict()
+    validator.validate(flattened_obj)
+
+
+def _load_schema(schema):
+    """Returns a validator for the schema passed as argument.
+
+    Args:
+        schema (dict or path): either a schema object already in
+            memory or a path where to read one
+
+    Returns:
+        validator object for the schema
+
+    Raises:
+        ValueError: if ``schema`` is a file and either the file does not exist or
+            its format is not recognized
+    """
     # If schema is a string, assume it's a file containing the schema
-    if isinstance(schema, six.string_types):
-        # If it is not a valid file raise an appropriate error
-        if not os.path.isfile(schema):
+    if isinstance(schema, str):
+        # If it is not a valid file raise an appropriate error. A single
+        # stat call retrieves both the type and the modification time.
+        try:
+            schema_stat = os.stat(schema)
+        except OSError:
+            schema_stat = None
+        if schema_stat is None or not stat.S_ISREG(schema_stat.st_mode):
             msg = '"{0}" does not exist or is not a file'
             # TODO: in python > 3 a FileNotFoundError would be more appropriate
             raise ValueError(msg.format(schema))
@@ -256,24 +313,118 @@ def validate(cfg_object, schema):
             msg = msg.format(schema_format, ", ".join(list(ubimaior.formats.FORMATTERS)))
             raise ValueError(msg)
 
-        schema_formatter = ubimaior.formats.FORMATTERS[schema_format]
-        schema_file = schema
-        with open(schema_file) as schema_f:
-            schema = schema_formatter.load(schema_f)
+        return _get_validator_from_file(schema, schema_stat)
 
-    flattened_obj = cfg_object.as_dict()
-    jsonschema.validate(flattened_obj, schema)
+    return _get_validator_for(schema)
 
 
-def _is_empty(item):
-    # If it is not a dictionary cast to bool
-    if not isinstance(item, ubimaior.mappings.MutableMapping):
-        return not bool(item)
+#: Maps the path of schema files to their stat signature and validator
+_SCHEMA_FILE_CACHE = {}
+
+
+def _get_validator_from_file(schema_file, schema_stat):
+    """Returns a validator for a schema stored in a file. The file is read
+    again only if it was modified since the last time it was requested.
+
+    Args:
+        schema_file (str): path to the file containing the schema
+        schema_stat (os.stat_result): result of ``os.stat`` on the file
+
+    Returns:
+        validator object for the schema
+    """
+    signature = (
+        schema_stat.st_ino,
+        schema_stat.st_mtime_ns,
+        schema_stat.st_ctime_ns,
+        schema_stat.st_size,
+    )
+    cached = _SCHEMA_FILE_CACHE.get(schema_file)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    schema_format = os.path.splitext(schema_file)[1].lstrip(".")
+    schema_formatter = ubimaior.formats.FORMATTERS[schema_format]
+    with open(schema_file, encoding="utf-8") as schema_f:
+        schema = schema_formatter.load(schema_f)
+    validator = _get_validator_for(schema)
+    _SCHEMA_FILE_CACHE[schema_file] = (signature, validator)
+    return validator
+
+
+def _get_validator_for(schema):
+    """Returns a validator for a schema in memory, reusing the one that was built
+    the last time the same schema was requested.
+
+    Args:
+        schema (dict): schema object
+
+    Returns:
+        validator object for the schema
+
+    Raises:
+        jsonschema.SchemaError: if the schema does not conform to the jsonschema
+            specifications
+    """
+    try:
+        schema_key = json.dumps(schema, sort_keys=True)
+    except (TypeError, ValueError):
+        # Schemas with values that have no JSON representation, like dates
+        # loaded from YAML, are still valid but can't be cached
+        return _make_validator(schema)
+    return _get_validator(schema_key)
 
-    # If it is a dictionary recurse
-    if not item:
-        return True
-    return all(_is_empty(v) for v in item.values())
+
+@functools.lru_cache(maxsize=128)
+def _get_validator(schema_key):
+    """Returns a validator for a schema, checking the schema only the
+    first time it is requested.
+
+    Args:
+        schema_key (str): canonical JSON representation of the schema
+
+    Returns:
+        validator object for the schema
+
+    Raises:
+        jsonschema.SchemaError: if the schema does not conform to the jsonschema
+            specifications
+    """
+    return _make_validator(json.loads(schema_key))
+
+
+def _make_validator(schema):
+    """Checks a schema and returns a validator for it.
+
+    Args:
+        schema (dict): schema object
+
+    Returns:
+        validator object for the schema
+
+    Raises:
+        jsonschema.SchemaError: if the schema does not conform to the jsonschema
+            specifications
+    """
+    # jsonschema is imported on first use, as it dominates the import time of the package
+    import jsonschema  # pylint: disable=import-outside-toplevel
+
+    validator_cls = jsonschema.validators.validator_for(schema)
+    validator_cls.check_schema(schema)
+    return validator_cls(schema)
+
+
+def _is_empty(item):
+    # Dictionaries are empty if all of their values are, so visit nested values
+    # with an explicit stack and stop at the first one that is not empty
+    stack = [item]
+    while stack:
+        current = stack.pop()
+        if isinstance(current, ubimaior.mappings.MutableMapping):
+            stack.extend(current.values())
+        elif current:
+            return False
+    return True
 
 
 def load(config_name, scopes=None, config_format=None, schema=None):
@@ -302,18 +453,12 @@ def load(config_name, scopes=None, config_format=None, schema=None):
     # Retrieve the reader of the files
     formatter = ubimaior.formats.FORMATTERS[settings.format]
 
-    mappings = []
-    for scope_name, directory in settings.scopes:
-        current = os.path.join(directory, config_filename)
-
-        # Check if the file we are looking for exists
-        if not os.path.exists(current) and not os.path.isfile(current):
-            mappings.append((scope_name, {}))
-            continue
-
-        # If so load the content and append it to the hierarchy
-        with open(current) as partial_cfg:
-            mappings.append((scope_name, formatter.load(partial_cfg)))
+    # Read the scopes, retaining their order in the hierarchy. Settings are initialized
+    # to None, but retrieve_settings always sets scopes to a list.
+    mappings = [
+        _load_scope(scope, config_filename, formatter)
+        for scope in settings.scopes  # pylint: disable=not-an-iterable
+    ]
 
     obj = ubimaior.mappings.OverridableMapping(mappings)
 
@@ -324,6 +469,113 @@ def load(config_name, scopes=None, config_format=None, schema=None):
     return obj
 
 
+#: Size of the buffer used to read configuration files
+_READ_BUFFER_SIZE = 64 * 1024
+
+#: Maximum number of configuration files whose content is cached
+_SCOPE_FILE_CACHE_SIZE = 128
+
+#: Maps the path of configuration files to their stat signature and content,
+#: from the least to the most recently used
+_SCOPE_FILE_CACHE = collections.OrderedDict()
+
+#: Guards the cache above, which is reordered on each access
+_SCOPE_FILE_CACHE_LOCK = threading.Lock()
+
+
+def _load_scope(scope, config_filename, formatter):
+    """Loads the part of a hierarchical configuration stored in a single scope.
+    If the formatter caches what it loads, the file is parsed again only if it was
+    modified since the last time it was read.
+
+    Args:
+        scope (Scope): scope to be read
+        config_filename (str): name of the configuration file, including its extension
+        formatter: object used to load the file
+
+    Returns:
+        tuple of 2 elements, where the first is the name of the scope and the second
+        its mapping (empty if the file does not exist)
+    """
+    current = os.path.join(scope.path, config_filename)
+
+    # A file that can't be reached means the scope is empty
+    try:
+        current_stat = os.stat(current)
+    except OSError:
+        return scope.name, {}
+    if not stat.S_ISREG(current_stat.st_mode):
+        return scope.name, {}
+
+    if not formatter.cache_loaded:
+        return scope.name, _read_scope_file(current, formatter)
+
+    # Inode and ctime also change when a file is replaced by an atomic rename,
+    # or rewritten within the resolution of the modification time
+    signature = (
+        current_stat.st_ino,
+        current_stat.st_mtime_ns,
+        current_stat.st_ctime_ns,
+        current_stat.st_size,
+    )
+    with _SCOPE_FILE_CACHE_LOCK:
+        cached = _SCOPE_FILE_CACHE.get(current)
+        if cached is not None and cached[0] == signature:
+            _SCOPE_FILE_CACHE.move_to_end(current)
+
+    if cached is None or cached[0] != signature:
+        cached = (signature, _read_scope_file(current, formatter))
+        with _SCOPE_FILE_CACHE_LOCK:
+            _SCOPE_FILE_CACHE[current] = cached
+            _SCOPE_FILE_CACHE.move_to_end(current)
+            if len(_SCOPE_FILE_CACHE) > _SCOPE_FILE_CACHE_SIZE:
+                _SCOPE_FILE_CACHE.popitem(last=False)
+
+    # The caller may modify the mapping, so never hand out the cached object
+    return scope.name, _copy_loaded(cached[1])
+
+
+def _read_scope_file(path, formatter):
+    """Reads a configuration file.
+
+    Args:
+        path (str): path of the file
+        formatter: object used to load the file
+
+    Returns:
+        the object loaded from the file
+    """
+    # Formatters that accept bytes are spared the decoding of the text stream.
+    # Files are always UTF-8 encoded, regardless of the locale.
+    mode, encoding = ("rb", None) if formatter.binary else ("r", "utf-8")
+    with open(path, mode, buffering=_READ_BUFFER_SIZE, encoding=encoding) as partial_cfg:
+        return formatter.load(partial_cfg)
+
+
+#: Types of the values in a loaded object that can be shared among copies
+_IMMUTABLE_TYPES = frozenset([str, int, float, bool, type(None)])
+
+
+def _copy_loaded(obj):
+    """Returns a deep copy of an object loaded from a configuration file. Plain
+    dictionaries, lists and scalars are copied with less overhead than ``copy.deepcopy``.
+
+    Args:
+        obj: object to be copied
+
+    Returns:
+        copy of the object
+    """
+    obj_type = type(obj)
+    if obj_type is dict:
+        return {key: _copy_loaded(value) for key, value in obj.items()}
+    if obj_type is list:
+        return [_copy_loaded(item) for item in obj]
+    if obj_type in _IMMUTABLE_TYPES:
+        return obj
+    return copy.deepcopy(obj)
+
+
 def dump(cfg, config_name, scopes=None, config_format=None, schema=None):
     """Loads a hierarchical configuration into an object.
 
@@ -358,17 +610,32 @@ def dump(cfg, config_name, scopes=None, config_format=None, schema=None):
     if schema:
         validate(cfg, schema)
 
-    # Dump the scopes to file
-    scopes_d = dict(settings.scopes)
-    for scope_name, obj in cfg.mappings.items():
+    # Dump the scopes to file. Scopes in the object have already been checked
+    # to be in the same order as in settings, so they can be paired directly.
+    objs = (obj for name, obj in cfg.mappings.items() if name != cfg.scratch_key)
+    for scope, obj in zip(settings.scopes, objs):
         # If the object is empty, then continue to dump the hierarchy
         if _is_empty(obj):
             continue
 
-        directory = scopes_d[scope_name]
-        current = os.path.join(directory, config_filename)
-        with open(current, "w") as partial_cfg:
+        current = os.path.join(scope.path, config_filename)
+        with open(current, "w", encoding="utf-8") as partial_cfg:
             formatter.dump(obj, partial_cfg)
+        # Don't rely on the modification time, which may have a coarse resolution
+        with _SCOPE_FILE_CACHE_LOCK:
+            _SCOPE_FILE_CACHE.pop(current, None)
+
+
+def clear_cache():
+    """Drops everything that was cached from the filesystem: scope files and schemas.
+
+    Files are read again when they change, but long-running processes may call this
+    function to release memory or after modifying files from elsewhere.
+    """
+    with _SCOPE_FILE_CACHE_LOCK:
+        _SCOPE_FILE_CACHE.clear()
+    _SCHEMA_FILE_CACHE.clear()
+    _get_validator.cache_clear()
 
 
 def retrieve_settings(scopes=None, config_format=None, schema=None):
@@ -379,10 +646,15 @@ def retrieve_settings(scopes=None, config_format=None, schema=None):
         ConfigSettings: object containing the current settings
     """
     settings = ConfigSettings()
-    settings["scopes"] = scopes or DEFAULTS["scopes"]
-    settings["format"] = config_format or DEFAULTS["format"]
-    # TODO: still to be implemented
-    settings["schema"] = schema or DEFAULTS["schema"]
+    # TODO: "schema" is still to be implemented
+    arguments = (("scopes", scopes), ("format", config_format), ("schema", schema))
+    for key, value in arguments:
+        default = getattr(DEFAULTS, key)
+        if value or default is None:
+            settings[key] = value or default
+        else:
+            # Defaults were validated when they were set
+            setattr(settings, key, default)
     return settings
 
 
@@ -398,12 +670,15 @@ def _validate_cfg_consistency(cfg, settings):
             ``settings``
     """
     # Check that we don't have modifications in scratch still to be merged
-    if not _is_empty(cfg.mappings["_scratch_"]):
+    if not _is_empty(cfg.mappings[cfg.scratch_key]):
         msg = "cannot dump an object with modifications in scratch"
         raise ValueError(msg)
-    # Check that the current object matches the scope that will be used
-    scopes_in_object = [x for x, _ in cfg.mappings.items() if x != "_scratch_"]
-    scopes_in_settings = [x for x, _ in settings.scopes]
-    if scopes_in_object != scopes_in_settings:
+    # Check that the current object matches the scope that will be used,
+    # stopping at the first mismatch
+    scopes_in_object = (x for x in cfg.mappings if x != cfg.scratch_key)
+    scopes_in_settings = (scope.name for scope in settings.scopes)
+    missing = object()
+    pairs = itertools.zip_longest(scopes_in_object, scopes_in_settings, fillvalue=missing)
+    if any(x != y for x, y in pairs):
         msg = "scopes in the object do not match with scopes in settings"
         raise ValueError(msg)
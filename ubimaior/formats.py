@@ -3,20 +3,67 @@
 
 import abc
 import collections
-import json
-
 import enum
-import six
+import importlib
+import importlib.util
+import io
+import json
+import threading
 
 import ubimaior
+import ubimaior.mappings
+import ubimaior.sequences
+
+try:  # Faster JSON (de)serialization, if available
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 #: Maps the format name to the formatter object
 FORMATTERS = {}
 
+#: Maps the name of optional backends to the module implementing them
+_BACKENDS = {"yaml": "ruamel.yaml", "toml": "toml"}
+
+
+def _is_available(backend):
+    """Returns True if an optional backend can be imported, without importing it.
+
+    Args:
+        backend (str): name of the backend
+
+    Returns:
+        True or False
+    """
+    try:
+        return importlib.util.find_spec(_BACKENDS[backend]) is not None
+    except ImportError:
+        return False
+
 
-class Loader(six.with_metaclass(abc.ABCMeta, object)):  # pylint: disable=too-few-public-methods
+def _import_backend(backend):
+    """Imports an optional backend. Formatters call this on first use, so that
+    backends are not imported together with this module.
+
+    Args:
+        backend (str): name of the backend
+
+    Returns:
+        the module implementing the backend
+    """
+    return importlib.import_module(_BACKENDS[backend])
+
+
+class Loader(metaclass=abc.ABCMeta):  # pylint: disable=too-few-public-methods
     """Abstract base class for something that could load an object from a stream."""
 
+    #: Whether ``load`` accepts streams opened in binary mode
+    binary = False
+
+    #: Whether loading is slower than copying what was loaded, so that the
+    #: content of configuration files is worth caching
+    cache_loaded = False
+
     @abc.abstractmethod
     def load(self, stream):
         """Load an object from stream and returns it.
@@ -29,7 +76,7 @@ class Loader(six.with_metaclass(abc.ABCMeta, object)):  # pylint: disable=too-fe
         """
 
 
-class Dumper(six.with_metaclass(abc.ABCMeta, object)):  # pylint: disable=too-few-public-methods
+class Dumper(metaclass=abc.ABCMeta):  # pylint: disable=too-few-public-methods
     """Abstract base class for something that could dump an object to a stream."""
 
     @abc.abstractmethod
@@ -43,7 +90,7 @@ class Dumper(six.with_metaclass(abc.ABCMeta, object)):  # pylint: disable=too-fe
 
 
 # pylint: disable=too-few-public-methods
-class PrettyPrinter(six.with_metaclass(abc.ABCMeta, object)):
+class PrettyPrinter(metaclass=abc.ABCMeta):
     """Abstract base class for something that could dump an object to a pretty printed string."""
 
     def pprint(self, obj, formatters=None):
@@ -57,7 +104,8 @@ class PrettyPrinter(six.with_metaclass(abc.ABCMeta, object)):
 
         Returns:
             tuple of 2 elements, where the first is a list of strings (the lines that are to be
-            printed) while the second is a list of scopes encoding the provenance of each line.
+            printed) while the second is a list of tuples of scopes encoding the provenance of
+            each line.
         """
         # Tokenize the object to be printed
         tokens = _tokenize_object(obj)
@@ -71,7 +119,7 @@ class PrettyPrinter(six.with_metaclass(abc.ABCMeta, object)):
             current = self.format_token(token, indent_block, formatters[token.obj_type])
             if current:
                 cfg_lines.append(current)
-                cfg_scopes.append(token.scope or [])
+                cfg_scopes.append(token.scope or ())
 
         return cfg_lines, cfg_scopes
 
@@ -105,10 +153,10 @@ def formatter(name, attribute=None):
         ValueError: if the attribute to be set is already present
     """
     # Check the input
-    if not isinstance(name, six.string_types):
+    if not isinstance(name, str):
         raise TypeError('the argument "name" needs to be of string type')
 
-    if not isinstance(attribute, six.string_types) and attribute is not None:
+    if not isinstance(attribute, str) and attribute is not None:
         raise TypeError('the argument "attribute" needs to be of string type')
 
     if attribute is not None and hasattr(ubimaior, attribute):
@@ -146,134 +194,243 @@ class TokenTypes(enum.Enum):
     VALUE = 6
 
 
+# Names used while tokenizing and formatting objects, bound at module level to
+# spare attribute lookups for each token
+_OverridableMapping = ubimaior.mappings.OverridableMapping
+_MergedSequence = ubimaior.sequences.MergedSequence
+_DICTIONARY_START = TokenTypes.DICTIONARY_START
+_ATTRIBUTE = TokenTypes.ATTRIBUTE
+_DICTIONARY_END = TokenTypes.DICTIONARY_END
+_LIST_START = TokenTypes.LIST_START
+_LIST_ITEM = TokenTypes.LIST_ITEM
+_LIST_END = TokenTypes.LIST_END
+_VALUE = TokenTypes.VALUE
+
+
 def _tokenize_object(obj, scope=None, indent_lvl=0):
+    # Objects are visited depth-first with an explicit stack, which holds either
+    # objects still to be tokenized or tokens to be emitted when their turn comes
     tokens = []
-    if isinstance(obj, ubimaior.OverridableMapping):
-        tokens.append(
-            _Token(
-                line=None,
-                scope=scope,
-                indent_lvl=indent_lvl,
-                obj_type=TokenTypes.DICTIONARY_START,
-                continuation=False,
-            )
-        )
-        for attribute, value in obj.items():
-            scope = obj.get_scopes(attribute)
-            # scope = [sc for sc, m in obj.mappings.items() if attribute in m]
+    stack = [(obj, scope, indent_lvl)]
+    # Most attributes share the same scopes, so equal scopes share the same tuple
+    interned_scopes = {}
+    while stack:
+        item = stack.pop()
+        if isinstance(item, _Token):
+            if item.obj_type == _DICTIONARY_END:
+                # Here we are closing the dictionary, so there's no further object
+                tokens[-1] = tokens[-1]._replace(continuation=False)
+            tokens.append(item)
+            continue
+
+        obj, scope, indent_lvl = item
+        if isinstance(obj, _OverridableMapping):
             tokens.append(
                 _Token(
-                    line=str(attribute),
+                    line=None,
                     scope=scope,
                     indent_lvl=indent_lvl,
-                    obj_type=TokenTypes.ATTRIBUTE,
+                    obj_type=_DICTIONARY_START,
                     continuation=False,
                 )
             )
-            # Descend on the current value
-            tokens.extend(_tokenize_object(value, scope=scope, indent_lvl=indent_lvl + 1))
+            children = []
+            for attribute, value in obj.items():
+                scope = tuple(obj.get_scopes(attribute))
+                scope = interned_scopes.setdefault(scope, scope)
+                children.append(
+                    _Token(
+                        line=str(attribute),
+                        scope=scope,
+                        indent_lvl=indent_lvl,
+                        obj_type=_ATTRIBUTE,
+                        continuation=False,
+                    )
+                )
+                # Descend on the current value
+                children.append((value, scope, indent_lvl + 1))
 
-        # Here we are closing the dictionary, so there's no further object
-        tokens[-1] = tokens[-1]._replace(continuation=False)
-        tokens.append(
-            _Token(
-                line=None,
-                scope=scope,
-                indent_lvl=indent_lvl,
-                obj_type=TokenTypes.DICTIONARY_END,
-                continuation=True,
+            # The end of the dictionary is emitted after all of its children
+            stack.append(
+                _Token(
+                    line=None,
+                    scope=scope,
+                    indent_lvl=indent_lvl,
+                    obj_type=_DICTIONARY_END,
+                    continuation=True,
+                )
             )
-        )
-
-    elif isinstance(obj, ubimaior.MergedSequence):
-        assert len(scope) == len(obj.sequences), "unexpected number of scopes"
-        tokens.append(
-            _Token(
-                line=None,
-                scope=scope,
-                indent_lvl=indent_lvl,
-                obj_type=TokenTypes.LIST_START,
-                continuation=False,
+            stack.extend(reversed(children))
+
+        elif isinstance(obj, _MergedSequence):
+            assert len(scope) == len(obj.sequences), "unexpected number of scopes"
+            tokens.append(
+                _Token(
+                    line=None,
+                    scope=scope,
+                    indent_lvl=indent_lvl,
+                    obj_type=_LIST_START,
+                    continuation=False,
+                )
             )
-        )
-        for component_scope, component_list in zip(scope, obj.sequences):
-            for value in component_list:
-                tokens.append(
-                    _Token(
-                        line=value,
-                        scope=[component_scope],
-                        indent_lvl=indent_lvl + 1,
-                        obj_type=TokenTypes.LIST_ITEM,
-                        continuation=True,
+            for component_scope, component_list in zip(scope, obj.sequences):
+                item_scope = (component_scope,)
+                item_scope = interned_scopes.setdefault(item_scope, item_scope)
+                for value in component_list:
+                    tokens.append(
+                        _Token(
+                            line=value,
+                            scope=item_scope,
+                            indent_lvl=indent_lvl + 1,
+                            obj_type=_LIST_ITEM,
+                            continuation=True,
+                        )
                     )
-                )
 
-        tokens[-1] = tokens[-1]._replace(continuation=False)
-        tokens.append(
-            _Token(
-                line=None,
-                scope=scope,
-                indent_lvl=indent_lvl,
-                obj_type=TokenTypes.LIST_END,
-                continuation=True,
+            tokens[-1] = tokens[-1]._replace(continuation=False)
+            tokens.append(
+                _Token(
+                    line=None,
+                    scope=scope,
+                    indent_lvl=indent_lvl,
+                    obj_type=_LIST_END,
+                    continuation=True,
+                )
             )
-        )
-
-    else:
-        assert len(scope) == 1, "expected a single scope for a scalar value"
-        tokens.append(
-            _Token(
-                line=obj,
-                scope=scope,
-                indent_lvl=indent_lvl,
-                obj_type=TokenTypes.VALUE,
-                continuation=True,
+
+        else:
+            assert len(scope) == 1, "expected a single scope for a scalar value"
+            tokens.append(
+                _Token(
+                    line=obj,
+                    scope=scope,
+                    indent_lvl=indent_lvl,
+                    obj_type=_VALUE,
+                    continuation=True,
+                )
             )
-        )
 
     return tokens
 
 
-@formatter("json", attribute="JSON")
-class JsonFormatter(Dumper, Loader, PrettyPrinter):
-    """Formatter for JSON"""
+#: Options that make the standard library output the same JSON as orjson
+_JSON_DUMPS_OPTIONS = {"separators": (",", ":"), "ensure_ascii": False}
 
-    def load(self, stream):
-        return json.load(stream)
 
-    def dump(self, obj, stream):
-        json.dump(obj, stream)
+def _json_dumps(obj):
+    """Serializes an object to a JSON formatted string, using orjson if available.
+
+    Args:
+        obj: object to be serialized
+
+    Returns:
+        JSON formatted string
+    """
+    if orjson is None:
+        return json.dumps(obj, **_JSON_DUMPS_OPTIONS)
+    return _json_dumpb(obj).decode("utf-8")
 
-    def format_token(self, token, indent_block, format_fn):
 
-        start_or_end_marker = {
-            TokenTypes.DICTIONARY_START,
-            TokenTypes.DICTIONARY_END,
-            TokenTypes.LIST_START,
-            TokenTypes.LIST_END,
-        }
+def _json_dumpb(obj):
+    """Serializes an object to UTF-8 encoded JSON, using orjson if available.
+
+    Args:
+        obj: object to be serialized
+
+    Returns:
+        JSON formatted bytes
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # Let the standard library handle integers beyond 64 bits, or raise
+            pass
+    return json.dumps(obj, **_JSON_DUMPS_OPTIONS).encode("utf-8")
 
-        line = "" if token.obj_type in start_or_end_marker else format_fn(json.dumps(token.line))
 
-        if token.obj_type == TokenTypes.DICTIONARY_START:
-            line += token.indent_lvl * indent_block + "{"
+#: Maps every digit to "0", so that runs of digits can be found with a substring search
+_DIGITS_TO_ZEROS = bytes.maketrans(b"123456789", b"0" * 9)
 
-        elif token.obj_type == TokenTypes.DICTIONARY_END:
-            line += token.indent_lvl * indent_block + "}"
+#: Shortest run of digits that may be an integer beyond the 64 bits supported by orjson
+_LONG_DIGITS = b"0" * 19
 
-        elif token.obj_type == TokenTypes.LIST_START:
-            line += token.indent_lvl * indent_block + "["
 
-        elif token.obj_type == TokenTypes.LIST_END:
-            line += token.indent_lvl * indent_block + "]"
+def _has_long_integers(data):
+    """Returns True if a JSON document might contain integers beyond 64 bits.
 
-        elif token.obj_type == TokenTypes.ATTRIBUTE:
-            line = indent_block * token.indent_lvl + line + ":"
+    Args:
+        data (bytes): JSON document
+
+    Returns:
+        True or False. Long runs of digits in strings may give false positives.
+    """
+    digits = data.translate(_DIGITS_TO_ZEROS)
+    start = digits.find(_LONG_DIGITS)
+    while start != -1:
+        # Skip the fractional part of floats, which is read as a float anyway
+        if not data.endswith(b".", 0, start):
+            return True
+        end = start + len(_LONG_DIGITS)
+        while digits.startswith(b"0", end):
+            end += 1
+        start = digits.find(_LONG_DIGITS, end)
+    return False
+
+
+def _json_loads(data):
+    """Deserializes a JSON document, using orjson if available. Documents that might
+    contain integers beyond 64 bits, which orjson would read as floats, are left to the
+    standard library.
+
+    Args:
+        data (str or bytes): JSON document
 
-        elif token.obj_type == TokenTypes.LIST_ITEM:
-            line = token.indent_lvl * indent_block + line
+    Returns:
+        the deserialized object
+    """
+    if orjson is None:
+        return json.loads(data)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if _has_long_integers(data):
+        return json.loads(data)
+    return orjson.loads(data)
+
+
+#: Characters that start or end a container in JSON
+_JSON_MARKERS = {
+    TokenTypes.DICTIONARY_START: "{",
+    TokenTypes.DICTIONARY_END: "}",
+    TokenTypes.LIST_START: "[",
+    TokenTypes.LIST_END: "]",
+}
+
+
+@formatter("json", attribute="JSON")
+class JsonFormatter(Dumper, Loader, PrettyPrinter):
+    """Formatter for JSON"""
+
+    binary = True
+
+    def load(self, stream):
+        return _json_loads(stream.read())
+
+    def dump(self, obj, stream):
+        # Binary streams get the encoded bytes directly, with no round-trip through str
+        if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)):
+            stream.write(_json_dumpb(obj))
+        else:
+            stream.write(_json_dumps(obj))
+
+    def format_token(self, token, indent_block, format_fn):
+        marker = _JSON_MARKERS.get(token.obj_type)
+        if marker is not None:
+            line = token.indent_lvl * indent_block + marker
         else:
-            line = indent_block * token.indent_lvl + line
+            line = token.indent_lvl * indent_block + format_fn(_json_dumps(token.line))
+            if token.obj_type == _ATTRIBUTE:
+                line += ":"
 
         if token.continuation:
             line += ","
@@ -281,42 +438,60 @@ class JsonFormatter(Dumper, Loader, PrettyPrinter):
         return line
 
 
-try:
-    import ruamel.yaml as yaml  # pylint: disable=consider-using-from-import
+if _is_available("yaml"):
 
     @formatter("yaml", attribute="YAML")
     class YamlFormatter(Dumper, Loader, PrettyPrinter):
         """Formatter for YAML"""
 
+        binary = True
+        cache_loaded = True
+
+        def __init__(self):  # pylint: disable=super-init-not-called
+            #: Objects used to load and dump YAML are not thread-safe,
+            #: so each thread creates its own on first use
+            self._local = threading.local()
+
+        def _get_yaml(self):
+            yaml = getattr(self._local, "yaml", None)
+            if yaml is None:
+                # A "safe" instance uses the C based parser and
+                # emitter of libyaml, when they are available
+                yaml = _import_backend("yaml").YAML(typ="safe")
+                self._local.yaml = yaml
+            return yaml
+
         def load(self, stream):
-            return yaml.load(stream, Loader=yaml.Loader)
+            return self._get_yaml().load(stream)
 
         def dump(self, obj, stream):
-            yaml.dump(obj, stream)
+            # The emitter issues many small writes: collect them in
+            # memory and hand the document to the stream at once
+            buffer = io.StringIO()
+            self._get_yaml().dump(obj, buffer)
+            stream.write(buffer.getvalue())
 
         def format_token(self, token, indent_block, format_fn):
             line = None if token.line is None else format_fn(str(token.line))
 
-            if token.obj_type == TokenTypes.ATTRIBUTE:
-                return indent_block * token.indent_lvl + line + ":"
-            if token.obj_type == TokenTypes.LIST_ITEM:
+            if token.obj_type == _ATTRIBUTE:
+                return token.indent_lvl * indent_block + line + ":"
+            if token.obj_type == _LIST_ITEM:
                 return (token.indent_lvl - 1) * indent_block + "- " + line
-            if token.obj_type == TokenTypes.VALUE:
-                return indent_block * token.indent_lvl + line
+            if token.obj_type == _VALUE:
+                return token.indent_lvl * indent_block + line
 
             return line
 
-except ImportError:  # pragma: no cover
-    pass  # pragma: no cover
-
 
-try:
-    import toml
+if _is_available("toml"):
 
     @formatter("toml", attribute="TOML")
     class TomlFormatter(Dumper, Loader, PrettyPrinter):
         """Formatter for TOML"""
 
+        cache_loaded = True
+
         def __init__(self):  # pylint: disable=super-init-not-called
             #: Keeps track of which attributes need to
             #: be prepended to a given key = value pair
@@ -327,10 +502,10 @@ try:
             self._current_attribute = None
 
         def load(self, stream):
-            return toml.load(stream)
+            return _import_backend("toml").load(stream)
 
         def dump(self, obj, stream):
-            toml.dump(obj, stream)
+            stream.write(_import_backend("toml").dumps(obj))
 
         @property
         def current_key(self):
@@ -342,49 +517,46 @@ try:
         def format_token(self, token, indent_block, format_fn):
             # TOML only accept objects as root, The following lines start / finish
             # a parsing sequence
-            if token.obj_type == TokenTypes.DICTIONARY_START and not self._pprint_started:
+            if token.obj_type == _DICTIONARY_START and not self._pprint_started:
                 self._pprint_started = True
                 return None
-            if token.obj_type == TokenTypes.DICTIONARY_END and not self._token_stack:
+            if token.obj_type == _DICTIONARY_END and not self._token_stack:
                 self._pprint_started = False
                 return None
 
             assert self._pprint_started, "unexpected event during formatting."
 
             # Operations that modify the cached attributes
-            if token.obj_type == TokenTypes.ATTRIBUTE:
+            if token.obj_type == _ATTRIBUTE:
                 self._current_attribute = token
                 return None
-            if token.obj_type == TokenTypes.DICTIONARY_START:
+            if token.obj_type == _DICTIONARY_START:
                 self._token_stack.append(self._current_attribute)
                 self._current_attribute = None
                 return None
-            if token.obj_type == TokenTypes.DICTIONARY_END:
+            if token.obj_type == _DICTIONARY_END:
                 self._current_attribute = self._token_stack.pop()
                 return None
 
             # Operations that return formatted output
             line = None
-            if token.obj_type == TokenTypes.LIST_START:
+            if token.obj_type == _LIST_START:
                 key, self._current_attribute = self.current_key, None
                 line = "{0} = [".format(key)
-            elif token.obj_type == TokenTypes.LIST_END:
+            elif token.obj_type == _LIST_END:
                 line = "]"
-            elif token.obj_type == TokenTypes.LIST_ITEM:
+            elif token.obj_type == _LIST_ITEM:
                 line = (
-                    indent_block * token.indent_lvl
+                    token.indent_lvl * indent_block
                     + repr(token.line)
                     + ("," if token.continuation else "")
                 )
-            elif token.obj_type == TokenTypes.VALUE:  # pragma: no cover
+            elif token.obj_type == _VALUE:  # pragma: no cover
                 value = str(token.line)
                 if isinstance(token.line, bool):
                     value = value.lower()
-                elif isinstance(token.line, six.string_types):
+                elif isinstance(token.line, str):
                     value = '"' + value + '"'
                 key, self._current_attribute = self.current_key, None
                 line = "{0} = {1}".format(key, value)
             return line
-
-except ImportError:  # pragma: no cover
-    pass  # pragma: no cover
@@ -4,8 +4,6 @@
 import copy
 import itertools
 
-import six
-
 from . import sequences
 
 try:
@@ -28,7 +26,7 @@ def _is_tuple_str_mapping(obj):
     return (
         isinstance(obj, tuple)
         and len(obj) == 2
-        and isinstance(obj[0], six.string_types)
+        and isinstance(obj[0], str)
         and isinstance(obj[1], MutableMapping)
     )
 
@@ -279,7 +277,7 @@ class OverridableMapping(_MappingBase):  # pylint: disable=too-many-ancestors
         # If the key is not convertible to string, raise an  exception.
         # This limitation is currently due to how we override keys
         # (appending a ':' after the key)
-        if not isinstance(key, six.string_types):
+        if not isinstance(key, str):
             msg = "unsupported key type [{0}]".format(type(key))
             raise TypeError(msg)
 
@@ -383,7 +381,7 @@ class OverridableMapping(_MappingBase):  # pylint: disable=too-many-ancestors
         target = target or next(itertools.dropwhile(lambda x: x == self.scratch_key, self.mappings))
 
         # Check target type
-        if not isinstance(target, six.string_types):
+        if not isinstance(target, str):
             raise TypeError('"target" must be of string type')
 
         # Check if the target is in the scope list
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 """Contain classes and functions that help to manage merged sequences"""
+
 import itertools
 
 try:
@@ -91,6 +92,8 @@ class MergedSequence(Sequence):
             IndexError: if ``idx`` is out of range
         """
         idx = len(self) + idx if idx < 0 else idx
+        if idx < 0:
+            raise IndexError("list index out of range")
 
         for counter, sequence in enumerate(self.sequences):
             if idx < len(sequence):